@@ -0,0 +1,833 @@
+"""
+Benchmarks del resolvedor de integrales por sustitución trigonométrica.
+
+Uso:
+    python benchmark.py deteccion [--repeticiones N]
+    python benchmark.py suite [--salida resultados.json] [--linea-base base.json]
+    python benchmark.py importacion [--salida resultados.json] [--linea-base base.json]
+    python benchmark.py simplificacion [--max-casos N] [--timeout S]
+    python benchmark.py tabla [--max-potencia N] [--repeticiones N]
+    python benchmark.py mixto [--timeout S]
+    python benchmark.py parametro [--valores N] [--muestra N]
+    python benchmark.py trazas [--repeticiones N]
+    python benchmark.py carrera [--max-casos N] [--timeout S]
+    python benchmark.py cache-theta [--timeout S]
+    python benchmark.py definida [--timeout S]
+    python benchmark.py niveles [--repeticiones N]
+    python benchmark.py graficas [--uniformes N] [--max-casos N] [--procesos N]
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import sympy as sp
+
+import index
+from index import (x, theta, clasificar_radicando, interpretar_funcion, Instrumentacion,
+                   SustitucionTrigonometricaInteractiva, FUNCIONES_PREDEFINIDAS, limite_tiempo)
+
+
+# ---------- Corpus ----------
+CORPUS_DETECCION = [
+    "1/(x**2 * sqrt(x**2 - 4))",
+    "1/sqrt(9 - x**2)",
+    "x**2/sqrt(16 + x**2)",
+    "1/(x * sqrt(x**2 - 25))",
+    "(4 - x**2)**(1/2)",
+    "sqrt(9 - 4*x**2)",
+    "1/sqrt(5 - x**2)",
+    "x**3*sqrt(x**2 + 7)/(x + 1)",
+]
+
+
+# Radicandos por patrón; {a2} es a²
+RADICANDOS = {
+    'tipo1': '{a2} - x**2',
+    'tipo2': '{a2} + x**2',
+    'tipo3': 'x**2 - {a2}',
+}
+
+
+def generar_familias(valores_a=(2, 3, 5), potencias=(0, 1, 2, 3), coeficientes=(1, 3)):
+    """
+    Genera integrandos agrupados por familia, partiendo de las funciones
+    predefinidas del menú. La complejidad crece con la potencia de x en
+    el numerador o el denominador y con los coeficientes anidados.
+    """
+    casos = [{'familia': 'predefinidas', 'funcion': f, 'complejidad': 0}
+             for f in FUNCIONES_PREDEFINIDAS.values()]
+    for tipo, radicando in RADICANDOS.items():
+        for a in valores_a:
+            raiz = f"sqrt({radicando.format(a2=a**2)})"
+            for n in potencias:
+                potencia = {0: '1', 1: 'x'}.get(n, f'x**{n}')
+                for c in coeficientes:
+                    numerador = str(c) if n == 0 else (potencia if c == 1 else f"{c}*{potencia}")
+                    anidado = '' if c == 1 else f"/(1 + {c})"
+                    casos.append({'familia': f'{tipo}_numerador', 'complejidad': n,
+                                  'funcion': f"{numerador}{anidado}/{raiz}"})
+                    if n > 0:
+                        casos.append({'familia': f'{tipo}_denominador', 'complejidad': n,
+                                      'funcion': f"{c}/({potencia}*{raiz}){anidado}"})
+    return casos
+
+
+def generar_mixto(valores_a=(2, 3), desplazamientos=(-3, 1, 2), escalas=(1, 2)):
+    """
+    Corpus mixto: radicandos canónicos, escalados (c - k²x²) y desplazados
+    (A·x² + B·x + C, ya expandidos) con numeradores 1, x y x².
+    """
+    casos = []
+    for tipo, radicando in RADICANDOS.items():
+        for a in valores_a:
+            for k in escalas:
+                for h in (0, *desplazamientos):
+                    u = f"({k}*x + {h})" if h else f"({k}*x)"
+                    expandido = sp.expand(sp.sympify(radicando.format(a2=a**2).replace('x', u)))
+                    familia = 'desplazado' if h else ('escalado' if k != 1 else 'canonico')
+                    for numerador in ('1', 'x', 'x**2'):
+                        casos.append({'familia': familia,
+                                      'funcion': f"{numerador}/sqrt({expandido})"})
+    return casos
+
+
+# ---------- Detección por regex (implementación anterior, referencia) ----------
+def detectar_por_regex(expresion):
+    """Detección original: imprime la expresión y busca con re.search."""
+    func_str = str(expresion)
+    patrones = (
+        ('tipo1', r'sqrt\(\s*([0-9]+(?:\.[0-9]+)?)\s*-\s*x\*\*2\s*\)'),
+        ('tipo2', r'sqrt\(\s*([0-9]+(?:\.[0-9]+)?)\s*\+\s*x\*\*2\s*\)'),
+        ('tipo3', r'sqrt\(\s*x\*\*2\s*-\s*([0-9]+(?:\.[0-9]+)?)\s*\)'),
+    )
+    for tipo, patron in patrones:
+        coincidencia = re.search(patron, func_str)
+        if coincidencia:
+            return tipo, sp.Integer(int(float(coincidencia.group(1)) ** 0.5))
+    return None
+
+
+def _medir(funcion, expresiones, repeticiones):
+    """Devuelve (detecciones por segundo, número de patrones reconocidos)."""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultados = [funcion(e) for e in expresiones]
+    duracion = time.perf_counter() - inicio
+    reconocidos = sum(r is not None for r in resultados)
+    return repeticiones * len(expresiones) / duracion, reconocidos
+
+
+def benchmark_deteccion(repeticiones=200):
+    """Compara el rendimiento de la detección estructural frente a la regex."""
+    expresiones = [sp.sympify(f, locals={'x': x}) for f in CORPUS_DETECCION]
+    total = len(expresiones)
+
+    print(f"Corpus: {total} integrandos × {repeticiones} repeticiones\n")
+    print(f"    {'Método':<14}{'detecciones/s':>16}{'reconocidos':>14}")
+    for nombre, funcion in (('regex', detectar_por_regex),
+                            ('estructural', lambda e: clasificar_radicando(e, x))):
+        por_segundo, reconocidos = _medir(funcion, expresiones, repeticiones)
+        print(f"    {nombre:<14}{por_segundo:>16,.0f}{f'{reconocidos}/{total}':>14}")
+
+
+# ---------- Suite de extremo a extremo ----------
+def medir_caso(caso, timeout, memoria, simplificacion='reglas'):
+    """Resuelve un caso en modo silencioso midiendo latencia, pasos y memoria."""
+    # Medición en frío: sin cachés de integrales (en x y en θ) ni caché interna de SymPy
+    index.cache_integrales.limpiar()
+    index.cache_theta.limpiar()
+    sp.core.cache.clear_cache()
+
+    instrumentacion = Instrumentacion(medir_tamano=False)
+    resolvedor = SustitucionTrigonometricaInteractiva(interpretar_funcion(caso['funcion']), x,
+                                                      silencioso=True,
+                                                      instrumentacion=instrumentacion,
+                                                      simplificacion=simplificacion)
+    if memoria:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    try:
+        with limite_tiempo(timeout):
+            resultado = resolvedor.resolver_pasos()
+        estado = 'resuelto' if theta not in resultado.free_symbols else 'incompleto'
+    except TimeoutError:
+        estado = 'tiempo_agotado'
+    except Exception:
+        estado = 'error'
+    duracion = time.perf_counter() - inicio
+    pico = None
+    if memoria:
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        **caso,
+        'estado': estado,
+        'duracion': duracion,
+        'pasos': {r['paso']: r['duracion'] for r in instrumentacion.registros},
+        'memoria_pico': pico,
+    }
+
+
+def resumir(casos):
+    """Agrupa por familia: tasa de éxito, latencias p50/p95 y media por paso."""
+    resumen = {}
+    for familia in sorted({c['familia'] for c in casos}):
+        grupo = [c for c in casos if c['familia'] == familia]
+        duraciones = sorted(c['duracion'] for c in grupo)
+        pasos = {}
+        for c in grupo:
+            for paso, duracion in c['pasos'].items():
+                pasos.setdefault(paso, []).append(duracion)
+        picos = [c['memoria_pico'] for c in grupo if c['memoria_pico'] is not None]
+        resumen[familia] = {
+            'casos': len(grupo),
+            'tasa_exito': sum(c['estado'] == 'resuelto' for c in grupo) / len(grupo),
+            'p50': statistics.median(duraciones),
+            'p95': duraciones[min(len(duraciones) - 1, int(0.95 * len(duraciones)))],
+            'pasos': {p: statistics.mean(v) for p, v in pasos.items()},
+            'memoria_pico': max(picos) if picos else None,
+        }
+    return resumen
+
+
+def comparar_con_linea_base(resumen, linea_base, umbral):
+    """Lista de regresiones: latencia p50 mayor al umbral o menor tasa de éxito."""
+    regresiones = []
+    for familia, actual in resumen.items():
+        base = linea_base.get('resumen', {}).get(familia)
+        if base is None:
+            continue
+        if actual['p50'] > base['p50'] * (1 + umbral):
+            regresiones.append(f"{familia}: p50 {base['p50']:.3f}s → {actual['p50']:.3f}s")
+        if actual['tasa_exito'] < base['tasa_exito']:
+            regresiones.append(f"{familia}: éxito {base['tasa_exito']:.0%} → {actual['tasa_exito']:.0%}")
+    return regresiones
+
+
+def benchmark_suite(salida=None, linea_base=None, umbral=0.2, timeout=30.0,
+                    memoria=False, max_casos=None):
+    """Ejecuta la suite completa y devuelve el código de salida (1 si hay regresión)."""
+    casos = generar_familias()[:max_casos]
+    resultados = []
+    for numero, caso in enumerate(casos, 1):
+        medido = medir_caso(caso, timeout, memoria)
+        resultados.append(medido)
+        print(f"    [{numero:>3}/{len(casos)}] {medido['estado']:<15}{medido['duracion']:>8.2f}s  "
+              f"{caso['funcion']}", file=sys.stderr)
+
+    reporte = {
+        'metadatos': {
+            'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'sympy': sp.__version__,
+            'timeout': timeout,
+        },
+        'resumen': resumir(resultados),
+        'casos': resultados,
+    }
+
+    texto = json.dumps(reporte, indent=2, ensure_ascii=False)
+    if salida:
+        with open(salida, 'w', encoding='utf-8') as archivo:
+            archivo.write(texto)
+    else:
+        print(texto)
+
+    print(f"\n    {'Familia':<22}{'casos':>6}{'éxito':>8}{'p50 (s)':>10}{'p95 (s)':>10}", file=sys.stderr)
+    for familia, r in reporte['resumen'].items():
+        print(f"    {familia:<22}{r['casos']:>6}{r['tasa_exito']:>8.0%}{r['p50']:>10.3f}{r['p95']:>10.3f}",
+              file=sys.stderr)
+
+    if linea_base:
+        with open(linea_base, encoding='utf-8') as archivo:
+            regresiones = comparar_con_linea_base(reporte['resumen'], json.load(archivo), umbral)
+        for regresion in regresiones:
+            print(f"    ❌ Regresión: {regresion}", file=sys.stderr)
+        if regresiones:
+            return 1
+    return 0
+
+
+def benchmark_simplificacion(timeout=30.0, max_casos=None):
+    """Compara la reescritura dirigida con simplify()/trigsimp() genéricos."""
+    casos = generar_familias()[:max_casos]
+    print(f"Corpus: {len(casos)} integrandos, límite {timeout} s por integral\n")
+    print(f"    {'Modo':<12}{'éxito':>8}{'p50 (s)':>10}{'p95 (s)':>10}{'total (s)':>11}"
+          f"{'simplif. (s)':>14}")
+    for modo in ('reglas', 'generica'):
+        medidos = [medir_caso(caso, timeout, False, modo) for caso in casos]
+        duraciones = sorted(m['duracion'] for m in medidos)
+        # Tiempo en los pasos que antes usaban simplify()/trigsimp()
+        simplificando = sum(m['pasos'].get(p, 0.0) for m in medidos
+                            for p in ('sustitucion', 'simplificacion', 'desustitucion'))
+        exito = sum(m['estado'] == 'resuelto' for m in medidos) / len(medidos)
+        print(f"    {modo:<12}{exito:>8.0%}{statistics.median(duraciones):>10.3f}"
+              f"{duraciones[int(0.95 * (len(duraciones) - 1))]:>10.3f}"
+              f"{sum(duraciones):>11.2f}{simplificando:>14.2f}")
+
+
+# ---------- Tabla de antiderivadas ----------
+def benchmark_tabla(max_potencia=3, repeticiones=20, valores_a=(2, 3)):
+    """
+    Verifica cada entrada de la tabla contra integrate() (la derivada debe
+    devolver el integrando y la diferencia con integrate() ser constante) y
+    compara la consulta con el pipeline completo.
+    """
+    index.precompilar_tabla(max_potencia)
+    casos = [(tipo, m, 0, k) for tipo in RADICANDOS for k in (-3, -1, 1, 3)
+             for m in range(max_potencia + 1)]
+    casos += [(tipo, 0, n, k) for tipo in RADICANDOS for k in (-3, -1, 1, 3)
+              for n in range(1, max_potencia + 1)]
+
+    fallos = []
+    for tipo, m, n, k in casos:
+        radicando = index.radicando_patron(tipo, index.a_sym, x)
+        integrando = x**m / x**n * radicando**sp.Rational(k, 2)
+        tabla = index.antiderivada_tabla(tipo, m, n, k)
+        if tabla is None:
+            fallos.append((tipo, m, n, k, 'sin entrada'))
+            continue
+        # Punto dentro del dominio real de cada radicando, con a = 2
+        punto = {x: sp.Rational(5, 2) if tipo == 'tipo3' else sp.Rational(1, 3), index.a_sym: 2}
+        if abs(sp.N((sp.diff(tabla, x) - integrando).subs(punto))) > 1e-9:
+            fallos.append((tipo, m, n, k, 'derivada'))
+            continue
+        with limite_tiempo(30):
+            try:
+                referencia = sp.integrate(integrando.subs(index.a_sym, 2), x)
+            except TimeoutError:
+                continue
+        if referencia.has(sp.Integral, sp.Piecewise):
+            continue
+        diferencia = sp.diff(tabla.subs(index.a_sym, 2) - referencia, x)
+        if abs(sp.N(diferencia.subs(punto))) > 1e-9:
+            fallos.append((tipo, m, n, k, 'integrate'))
+    print(f"Entradas verificadas: {len(casos) - len(fallos)}/{len(casos)}")
+    for fallo in fallos:
+        print(f"    ❌ {fallo}")
+
+    integrandos = [interpretar_funcion(f"x**{m}*({RADICANDOS[tipo].format(a2=a**2)})**({k}/2)")
+                   for tipo in RADICANDOS for a in valores_a for m in range(max_potencia + 1)
+                   for k in (-1, 1)]
+    print(f"\n    {'Modo':<12}{'integrales/s':>16}")
+    for nombre, usar_tabla in (('tabla', True), ('pipeline', False)):
+        inicio = time.perf_counter()
+        for integrando in integrandos * (repeticiones if usar_tabla else 1):
+            if not usar_tabla:
+                # Pipeline en frío: nada de la verificación ni de casos anteriores
+                index.cache_integrales.limpiar()
+                index.cache_theta.limpiar()
+            SustitucionTrigonometricaInteractiva(integrando, x, silencioso=True,
+                                                 usar_tabla=usar_tabla).resolver_pasos()
+        veces = repeticiones if usar_tabla else 1
+        por_segundo = len(integrandos) * veces / (time.perf_counter() - inicio)
+        print(f"    {nombre:<12}{por_segundo:>16,.1f}")
+    return 1 if fallos else 0
+
+
+# ---------- Corpus mixto (completar el cuadrado) ----------
+def benchmark_mixto(timeout=30.0):
+    """Tasa de éxito verificada con y sin completar el cuadrado."""
+    casos = generar_mixto()
+    print(f"Corpus: {len(casos)} integrandos, límite {timeout} s por integral\n")
+    familias = sorted({caso['familia'] for caso in casos})
+    print(f"    {'Modo':<22}" + ''.join(f"{f:>13}" for f in familias) + f"{'total (s)':>12}")
+    for nombre, completar in (('sin preprocesador', False), ('completar cuadrado', True)):
+        exitos = dict.fromkeys(familias, 0)
+        inicio = time.perf_counter()
+        for caso in casos:
+            resolvedor = SustitucionTrigonometricaInteractiva(
+                interpretar_funcion(caso['funcion']), x, silencioso=True,
+                completar_cuadrado=completar)
+            try:
+                with limite_tiempo(timeout):
+                    resolvedor.resolver_pasos()
+                    exitos[caso['familia']] += resolvedor.verificar(semilla=0)['valido']
+            except Exception:
+                pass
+        duracion = time.perf_counter() - inicio
+        totales = {f: sum(c['familia'] == f for c in casos) for f in familias}
+        print(f"    {nombre:<22}" + ''.join(f"{f'{exitos[f]}/{totales[f]}':>13}" for f in familias)
+              + f"{duracion:>12.2f}")
+
+
+# ---------- Barrido del parámetro a ----------
+PLANTILLAS_PARAMETRO = [
+    "x**2*sqrt(9 - 4*x**2)",
+    "1/(x**2*sqrt(x**2 + 4))",
+    "sqrt(x**2 - 25)/x",
+]
+
+
+def benchmark_parametro(valores=10000, muestra=50):
+    """
+    Barrido de F(1/2) - F(1/4) sobre `valores` valores de a: una resolución
+    por cada a (medida en `muestra` valores y extrapolada) frente a una sola
+    resolución simbólica más evaluación vectorizada.
+    """
+    import numpy as np
+
+    print(f"Barrido sobre {valores} valores de a "
+          f"(resolución por valor extrapolada de {muestra})\n")
+    print(f"    {'Plantilla':<26}{'por valor (s)':>15}{'simbólico (s)':>15}{'aceleración':>13}")
+    for plantilla in PLANTILLAS_PARAMETRO:
+        index.cache_integrales.limpiar()
+        index.cache_theta.limpiar()
+        familia = index.FamiliaParametrica.desde_integrando(interpretar_funcion(plantilla))
+        tipo = clasificar_radicando(familia.plantilla.subs(index.a_sym, 2))[0]
+        # Valores de a para los que [1/4, 1/2] queda dentro del dominio real
+        inicio_a, fin_a = (0.1, 0.4) if tipo == 'tipo3' else (2.0, 20.0)
+        barrido = np.linspace(inicio_a, fin_a, valores)
+        limites = (0.25, 0.5) if tipo != 'tipo3' else (0.5, 1.0)
+
+        inicio = time.perf_counter()
+        for a in barrido[:muestra]:
+            concreta = familia.plantilla.subs(index.a_sym, sp.nsimplify(a))
+            index.cache_integrales.limpiar()
+            index.cache_theta.limpiar()
+            resultado = SustitucionTrigonometricaInteractiva(concreta, x,
+                                                             silencioso=True).resolver_pasos()
+            float(resultado.subs(x, limites[1]) - resultado.subs(x, limites[0]))
+        por_valor = (time.perf_counter() - inicio) / muestra * valores
+
+        inicio = time.perf_counter()
+        familia.integral_definida(limites[0], limites[1], barrido)
+        simbolico = time.perf_counter() - inicio
+        print(f"    {plantilla:<26}{por_valor:>15.2f}{simbolico:>15.3f}"
+              f"{por_valor / simbolico:>12.0f}x")
+
+
+# ---------- Memoria de las trazas de auditoría ----------
+def _memoria_retenida(casos, repeticiones, guardar):
+    """Bytes retenidos por resolución al guardar cada traza con `guardar`."""
+    tracemalloc.start()
+    for _ in range(repeticiones):
+        for integrando in casos:
+            # Sin cachés, cada resolución crea sus propios árboles como en un lote real
+            sp.core.cache.clear_cache()
+            index.cache_integrales.limpiar()
+            index.cache_theta.limpiar()
+            resolvedor = SustitucionTrigonometricaInteractiva(integrando, x, silencioso=True)
+            resolvedor.resolver()
+            guardar(resolvedor.traza)
+    sp.core.cache.clear_cache()
+    index.cache_integrales.limpiar()
+    index.cache_theta.limpiar()
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return actual / (repeticiones * len(casos))
+
+
+def benchmark_trazas(repeticiones=3):
+    """Memoria retenida por traza: lista de PasoTraza vs AlmacenTrazas."""
+    casos = [interpretar_funcion(caso['funcion']) for caso in generar_familias()]
+    print(f"Trazas de {repeticiones * len(casos)} resoluciones\n")
+    print(f"    {'Almacenamiento':<28}{'bytes/traza':>14}{'1M trazas (MB)':>17}")
+
+    lista = []
+    almacen = index.AlmacenTrazas()
+    with open(os.devnull, 'w') as nulo:
+        en_disco = index.AlmacenTrazas(conservar=False)
+
+        def volcar(traza):
+            en_disco.agregar(traza)
+            en_disco.volcar_jsonl(nulo)
+
+        for nombre, guardar in (('lista de PasoTraza', lista.append),
+                                ('AlmacenTrazas', almacen.agregar),
+                                ('AlmacenTrazas + JSONL', volcar)):
+            por_traza = _memoria_retenida(casos, repeticiones, guardar)
+            print(f"    {nombre:<28}{por_traza:>14,.0f}{por_traza:>17,.0f}")
+    print(f"\n    Subexpresiones distintas: {en_disco.estadisticas()['subexpresiones']}")
+
+
+# ---------- Carrera de estrategias ----------
+def benchmark_carrera(max_casos=None, timeout=30.0):
+    """Estrategia ganadora y latencia de resolver_en_carrera en el corpus mixto."""
+    casos = (generar_familias() + generar_mixto())[:max_casos]
+    # Calentar el proceso padre: los hijos heredan por fork lo ya cargado
+    for estrategia in index.ESTRATEGIAS:
+        index._resolver_estrategia(estrategia, FUNCIONES_PREDEFINIDAS[2])
+
+    print(f"Corpus: {len(casos)} integrandos, límite {timeout} s por integral\n")
+    duraciones, sin_resolver = [], 0
+    for caso in casos:
+        respuesta = index.resolver_en_carrera(caso['funcion'], timeout=timeout)
+        duraciones.append(respuesta['duracion'])
+        sin_resolver += respuesta['estrategia'] is None
+    duraciones.sort()
+
+    print(f"    {'Estrategia':<18}{'victorias':>10}")
+    for estrategia, victorias in index.victorias_estrategias.items():
+        print(f"    {estrategia:<18}{victorias:>10}")
+    print(f"    {'sin resultado':<18}{sin_resolver:>10}")
+    print(f"\n    p50 {statistics.median(duraciones):.3f} s, "
+          f"p95 {duraciones[int(0.95 * (len(duraciones) - 1))]:.3f} s")
+
+
+# ---------- Caché de integrales en θ ----------
+def benchmark_cache_theta(timeout=30.0):
+    """
+    Tiempo del paso de integración en θ sobre el corpus completo, resolviendo
+    cada integrando con la caché de núcleos vacía y compartiéndola.
+    """
+    casos = generar_familias() + generar_mixto()
+    print(f"Corpus: {len(casos)} integrandos (sin tabla en x, para pasar por θ)\n")
+    print(f"    {'Caché en θ':<14}{'integración (s)':>17}{'desustitución (s)':>19}"
+          f"{'aciertos':>10}{'tasa':>8}")
+    for nombre, compartida in (('vacía', False), ('compartida', True)):
+        index.cache_theta.limpiar()
+        integracion = desustitucion = 0.0
+        aciertos = consultas = 0
+        for caso in casos:
+            # Sin caché de SymPy ni de integrate(): sólo cuenta la caché de núcleos
+            sp.core.cache.clear_cache()
+            index.cache_integrales.limpiar()
+            if not compartida:
+                index.cache_theta.limpiar()
+            instrumentacion = Instrumentacion(medir_tamano=False)
+            resolvedor = SustitucionTrigonometricaInteractiva(
+                interpretar_funcion(caso['funcion']), x, silencioso=True,
+                instrumentacion=instrumentacion, usar_tabla=False)
+            try:
+                with limite_tiempo(timeout):
+                    resolvedor.resolver_pasos()
+            except Exception:
+                continue
+            pasos = {r['paso']: r['duracion'] for r in instrumentacion.registros}
+            integracion += pasos.get('integracion', 0.0)
+            desustitucion += pasos.get('desustitucion', 0.0)
+            paso = next(p for p in resolvedor.traza if p.nombre == "Integración en θ")
+            aciertos += paso.datos['acierto_cache']
+            consultas += 1
+        print(f"    {nombre:<14}{integracion:>17.2f}{desustitucion:>19.2f}"
+              f"{aciertos:>10}{aciertos / consultas:>8.0%}")
+    print(f"\n    Núcleos distintos: {index.estadisticas_cache()['integracion_theta']['entradas_memoria']}")
+
+
+# ---------- Integral definida en θ ----------
+def _limites_en_dominio(resolvedor):
+    """Límites en x dentro del dominio del patrón y lejos del polo de 1/x^n."""
+    a = resolvedor.parametro_a
+    u_inf, u_sup = {'tipo1': (a / 4, a / 2), 'tipo2': (a / 4, a)}.get(
+        resolvedor.tipo_sustitucion, (5 * a / 4, 2 * a))
+    return tuple(u / resolvedor.escala - resolvedor.desplazamiento for u in (u_inf, u_sup))
+
+
+def _definida_en_x(funcion, lim_inf, lim_sup):
+    """Referencia: antiderivada en x (con desustitución) evaluada en los límites."""
+    resultado = SustitucionTrigonometricaInteractiva(funcion, x, silencioso=True).resolver_pasos()
+    return float(sp.N(resultado.subs(x, lim_sup) - resultado.subs(x, lim_inf)))
+
+
+def benchmark_definida(timeout=30.0):
+    """Latencia de resolver_definida frente a integrar en x y sustituir los límites."""
+    casos = generar_familias() + generar_mixto()
+    tiempos = {'en x': [], 'en θ': []}
+    discrepancias = fallos = 0
+    for caso in casos:
+        funcion = interpretar_funcion(caso['funcion'])
+        deteccion = SustitucionTrigonometricaInteractiva(funcion, x, silencioso=True)
+        if not deteccion.detectar_tipo_sustitucion():
+            continue
+        lim_inf, lim_sup = _limites_en_dominio(deteccion)
+        medidos = {}
+        try:
+            for modo in tiempos:
+                sp.core.cache.clear_cache()
+                index.cache_integrales.limpiar()
+                index.cache_theta.limpiar()
+                inicio = time.perf_counter()
+                with limite_tiempo(timeout):
+                    if modo == 'en x':
+                        valor = _definida_en_x(funcion, lim_inf, lim_sup)
+                    else:
+                        valor = SustitucionTrigonometricaInteractiva(
+                            funcion, x, silencioso=True).resolver_definida(lim_inf, lim_sup)['valor']
+                medidos[modo] = (time.perf_counter() - inicio, valor)
+        except Exception:
+            fallos += 1
+            continue
+        for modo, (duracion, _) in medidos.items():
+            tiempos[modo].append(duracion)
+        discrepancias += not math.isclose(medidos['en x'][1], medidos['en θ'][1],
+                                          rel_tol=1e-9, abs_tol=1e-12)
+
+    print(f"Corpus: {len(tiempos['en θ'])} integrales definidas, {fallos} fallidas, "
+          f"{discrepancias} discrepancias\n")
+    print(f"    {'Modo':<10}{'p50 (s)':>10}{'p95 (s)':>10}{'total (s)':>11}")
+    for modo, duraciones in tiempos.items():
+        duraciones = sorted(duraciones)
+        print(f"    {modo:<10}{statistics.median(duraciones):>10.4f}"
+              f"{duraciones[int(0.95 * (len(duraciones) - 1))]:>10.4f}{sum(duraciones):>11.2f}")
+
+
+# ---------- Niveles de detalle ----------
+def benchmark_niveles(repeticiones=3):
+    """
+    Latencia de resolver() por nivel de detalle en las funciones predefinidas,
+    con la salida descartada y figuras con el backend Agg (sin ventana).
+    """
+    import contextlib
+    import matplotlib
+    matplotlib.use('Agg')
+
+    print(f"    {'Nivel':<12}{'p50 (ms)':>10}{'máx (ms)':>10}")
+    for nivel in index.NIVELES_DETALLE:
+        duraciones = []
+        for _ in range(repeticiones):
+            for func_str in FUNCIONES_PREDEFINIDAS.values():
+                sp.core.cache.clear_cache()
+                index.cache_integrales.limpiar()
+                index.cache_theta.limpiar()
+                resolvedor = SustitucionTrigonometricaInteractiva(
+                    interpretar_funcion(func_str), x, nivel_detalle=nivel)
+                with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+                    inicio = time.perf_counter()
+                    resolvedor.resolver()
+                    duraciones.append(time.perf_counter() - inicio)
+        print(f"    {nivel:<12}{statistics.median(duraciones) * 1000:>10.1f}"
+              f"{max(duraciones) * 1000:>10.1f}")
+
+
+# ---------- Gráficas adaptativas ----------
+def _bordes_dominio(resolvedor):
+    """Bordes x = ±a - h del dominio real (tipo1 y tipo3), donde f diverge."""
+    if resolvedor.tipo_sustitucion not in ('tipo1', 'tipo3'):
+        return []
+    limite = float(resolvedor.parametro_a / resolvedor.escala)
+    h = float(resolvedor.desplazamiento)
+    return [limite - h, -limite - h]
+
+
+def _distancia_a_bordes(xs, ys, bordes):
+    """Distancia mínima de un punto finito muestreado a cada borde."""
+    import numpy as np
+
+    finitos = xs[np.isfinite(ys)]
+    return [float(np.min(np.abs(finitos - b))) for b in bordes if finitos.size]
+
+
+def benchmark_graficas(uniformes=20000, max_casos=None, procesos=None):
+    """
+    Muestreo adaptativo frente a una malla uniforme densa para f y F: puntos
+    evaluados, tiempo y cuánto se acerca cada uno en f a los bordes del
+    dominio (relativo al ancho del intervalo). Después, rendimiento del lote a disco.
+    """
+    import tempfile
+    import numpy as np
+
+    casos = (generar_familias() + generar_mixto())[:max_casos]
+    medidas = {'uniforme': {'evaluaciones': [], 'tiempo': [], 'alcance': []},
+               'adaptativo': {'evaluaciones': [], 'tiempo': [], 'alcance': []}}
+    resueltos = []
+    for caso in casos:
+        resolvedor = SustitucionTrigonometricaInteractiva(
+            interpretar_funcion(caso['funcion']), x, silencioso=True, nivel_detalle='basico')
+        try:
+            resolvedor.resolver_pasos()
+        except Exception:
+            continue
+        resueltos.append(caso['funcion'])
+        izquierda, derecha = resolvedor.intervalo_grafica()
+        singularidades = resolvedor.singularidades()
+        bordes = _bordes_dominio(resolvedor)
+        # El alcance se mide sólo en f: F puede ser real en una sola rama (log sin |·|)
+        for funcion, medir_bordes in ((resolvedor.compilar_integrando(), bordes),
+                                      (resolvedor.compilar_antiderivada(), [])):
+            inicio = time.perf_counter()
+            xs = np.linspace(izquierda, derecha, uniformes)
+            ys = funcion(xs)
+            medidas['uniforme']['tiempo'].append(time.perf_counter() - inicio)
+            medidas['uniforme']['evaluaciones'].append(xs.size)
+            medidas['uniforme']['alcance'] += [
+                d / (derecha - izquierda) for d in _distancia_a_bordes(xs, ys, medir_bordes)]
+
+            inicio = time.perf_counter()
+            xs, ys, _ = index.muestrear_adaptativo(funcion, izquierda, derecha,
+                                                   singularidades=singularidades)
+            medidas['adaptativo']['tiempo'].append(time.perf_counter() - inicio)
+            medidas['adaptativo']['evaluaciones'].append(xs.size)
+            medidas['adaptativo']['alcance'] += [
+                d / (derecha - izquierda) for d in _distancia_a_bordes(xs, ys, medir_bordes)]
+
+    print(f"Corpus: {len(resueltos)} integrales, {2 * len(resueltos)} curvas (f y F)\n")
+    print(f"    {'Muestreo':<12}{'puntos p50':>12}{'puntos máx':>12}{'ms p50':>9}"
+          f"{'alcance p50':>13}{'alcance máx':>13}")
+    for nombre, medida in medidas.items():
+        print(f"    {nombre:<12}{statistics.median(medida['evaluaciones']):>12.0f}"
+              f"{max(medida['evaluaciones']):>12}{statistics.median(medida['tiempo']) * 1000:>9.2f}"
+              f"{statistics.median(medida['alcance']):>13.1e}{max(medida['alcance']):>13.1e}")
+
+    lote = resueltos[:24]
+    with tempfile.TemporaryDirectory() as directorio:
+        inicio = time.perf_counter()
+        resultados = index.renderizar_graficas_lote(lote, directorio, max_procesos=procesos)
+        duracion = time.perf_counter() - inicio
+    correctos = sum(r['estado'] == 'resuelto' for r in resultados)
+    print(f"\n    Lote a disco: {correctos}/{len(lote)} gráficas en {duracion:.2f} s "
+          f"({correctos / duracion:.1f} gráficas/s)")
+
+
+# ---------- Tiempo de importación ----------
+def medir_importacion(modulo='index'):
+    """
+    Importa el módulo en un intérprete nuevo con `python -X importtime` y
+    devuelve {módulo: tiempo acumulado en µs} para todo lo importado.
+    """
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    proceso = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+                             cwd=directorio, capture_output=True, text=True, check=True)
+    tiempos = {}
+    for linea in proceso.stderr.splitlines():
+        # Formato: "import time:  propio |  acumulado | [sangría]módulo"
+        partes = linea.split('|')
+        if len(partes) != 3 or not partes[1].strip().isdigit():
+            continue
+        tiempos[partes[2].strip()] = int(partes[1])
+    return tiempos
+
+
+def benchmark_importacion(repeticiones=5, salida=None, linea_base=None, umbral=0.2):
+    """Mediana del tiempo de importación de index.py en arranques en frío."""
+    mediciones = [medir_importacion() for _ in range(repeticiones)]
+    total = statistics.median(m['index'] for m in mediciones)
+    pesados = sorted(mediciones[0].items(), key=lambda par: par[1], reverse=True)[:10]
+
+    reporte = {
+        'metadatos': {
+            'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'repeticiones': repeticiones,
+        },
+        'importacion_us': total,
+        'modulos_cargados': len(mediciones[0]),
+        'mas_pesados': dict(pesados),
+    }
+    texto = json.dumps(reporte, indent=2, ensure_ascii=False)
+    if salida:
+        with open(salida, 'w', encoding='utf-8') as archivo:
+            archivo.write(texto)
+    else:
+        print(texto)
+
+    print(f"\n    import index: {total / 1000:.1f} ms (mediana de {repeticiones}), "
+          f"{len(mediciones[0])} módulos", file=sys.stderr)
+
+    if linea_base:
+        with open(linea_base, encoding='utf-8') as archivo:
+            base = json.load(archivo)['importacion_us']
+        if total > base * (1 + umbral):
+            print(f"    ❌ Regresión: importación {base / 1000:.1f} ms → {total / 1000:.1f} ms",
+                  file=sys.stderr)
+            return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    p_deteccion = subparsers.add_parser('deteccion', help='detección estructural vs regex')
+    p_deteccion.add_argument('--repeticiones', type=int, default=200)
+
+    p_suite = subparsers.add_parser('suite', help='latencia, memoria y éxito de resolver()')
+    p_suite.add_argument('--salida', help='archivo JSON de resultados (por defecto stdout)')
+    p_suite.add_argument('--linea-base', help='JSON de una ejecución anterior para comparar')
+    p_suite.add_argument('--umbral', type=float, default=0.2,
+                         help='aumento relativo de p50 considerado regresión (0.2 = 20%%)')
+    p_suite.add_argument('--timeout', type=float, default=30.0, help='segundos por integral')
+    p_suite.add_argument('--memoria', action='store_true',
+                         help='medir pico de memoria con tracemalloc (más lento)')
+    p_suite.add_argument('--max-casos', type=int)
+
+    p_importacion = subparsers.add_parser('importacion', help='tiempo de import index')
+    p_importacion.add_argument('--repeticiones', type=int, default=5)
+    p_importacion.add_argument('--salida', help='archivo JSON de resultados (por defecto stdout)')
+    p_importacion.add_argument('--linea-base', help='JSON de una ejecución anterior para comparar')
+    p_importacion.add_argument('--umbral', type=float, default=0.2)
+
+    p_simplificacion = subparsers.add_parser('simplificacion',
+                                             help='reescritura dirigida vs simplify() genérico')
+    p_simplificacion.add_argument('--timeout', type=float, default=30.0)
+    p_simplificacion.add_argument('--max-casos', type=int)
+
+    p_tabla = subparsers.add_parser('tabla', help='tabla de antiderivadas vs pipeline')
+    p_tabla.add_argument('--max-potencia', type=int, default=3)
+    p_tabla.add_argument('--repeticiones', type=int, default=20)
+
+    p_mixto = subparsers.add_parser('mixto', help='radicandos escalados y desplazados')
+    p_mixto.add_argument('--timeout', type=float, default=30.0)
+
+    p_parametro = subparsers.add_parser('parametro',
+                                        help='barrido de a: simbólico vs resolución por valor')
+    p_parametro.add_argument('--valores', type=int, default=10000)
+    p_parametro.add_argument('--muestra', type=int, default=50)
+
+    p_trazas = subparsers.add_parser('trazas', help='memoria de las trazas de auditoría')
+    p_trazas.add_argument('--repeticiones', type=int, default=3)
+
+    p_carrera = subparsers.add_parser('carrera', help='carrera de estrategias en paralelo')
+    p_carrera.add_argument('--max-casos', type=int)
+    p_carrera.add_argument('--timeout', type=float, default=30.0)
+
+    p_cache_theta = subparsers.add_parser('cache-theta',
+                                          help='aciertos de la caché de integrales en θ')
+    p_cache_theta.add_argument('--timeout', type=float, default=30.0)
+
+    p_definida = subparsers.add_parser('definida', help='integral definida en θ vs en x')
+    p_definida.add_argument('--timeout', type=float, default=30.0)
+
+    p_niveles = subparsers.add_parser('niveles', help='latencia por nivel de detalle')
+    p_niveles.add_argument('--repeticiones', type=int, default=3)
+
+    p_graficas = subparsers.add_parser('graficas', help='muestreo adaptativo de f y F')
+    p_graficas.add_argument('--uniformes', type=int, default=20000,
+                            help='puntos de la malla uniforme de referencia')
+    p_graficas.add_argument('--max-casos', type=int)
+    p_graficas.add_argument('--procesos', type=int)
+
+    args = parser.parse_args()
+    if args.benchmark == 'deteccion':
+        benchmark_deteccion(args.repeticiones)
+    elif args.benchmark == 'suite':
+        sys.exit(benchmark_suite(args.salida, args.linea_base, args.umbral, args.timeout,
+                                 args.memoria, args.max_casos))
+    elif args.benchmark == 'simplificacion':
+        benchmark_simplificacion(args.timeout, args.max_casos)
+    elif args.benchmark == 'tabla':
+        sys.exit(benchmark_tabla(args.max_potencia, args.repeticiones))
+    elif args.benchmark == 'mixto':
+        benchmark_mixto(args.timeout)
+    elif args.benchmark == 'parametro':
+        benchmark_parametro(args.valores, args.muestra)
+    elif args.benchmark == 'trazas':
+        benchmark_trazas(args.repeticiones)
+    elif args.benchmark == 'carrera':
+        benchmark_carrera(args.max_casos, args.timeout)
+    elif args.benchmark == 'cache-theta':
+        benchmark_cache_theta(args.timeout)
+    elif args.benchmark == 'definida':
+        benchmark_definida(args.timeout)
+    elif args.benchmark == 'niveles':
+        benchmark_niveles(args.repeticiones)
+    elif args.benchmark == 'graficas':
+        benchmark_graficas(args.uniformes, args.max_casos, args.procesos)
+    elif args.benchmark == 'importacion':
+        sys.exit(benchmark_importacion(args.repeticiones, args.salida, args.linea_base,
+                                       args.umbral))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+Cola de trabajo compartida en SQLite para resolver el catálogo de integrales
+con varios trabajadores, en una o varias máquinas con un sistema de archivos
+común.
+
+Uso:
+    python cola.py encolar cola.db funciones.jsonl
+    python cola.py trabajar cola.db [--lote 8] [--timeout 30] [--lease 120]
+    python cola.py estado cola.db
+    python cola.py exportar cola.db > resultados.jsonl
+    python cola.py local cola.db funciones.jsonl --procesos 4
+
+Cada trabajador reclama atómicamente un bloque de tareas con un lease (plazo
+de posesión). Si el trabajador muere, el lease vence y otro trabajador
+vuelve a reclamar esas tareas. Un resultado sólo se acepta del trabajador que
+todavía posee la tarea. Cada integrando se encola una sola vez: relanzar
+`encolar` o `local` sobre la misma cola omite los ya presentes y sólo
+procesa lo pendiente. SQLite necesita bloqueos POSIX fiables en el
+sistema de archivos compartido (NFSv4 o equivalente).
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from index import (inicializar_trabajador, leer_integrando, resolver_en_proceso,
+                   resultado_lote)
+
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS tareas (
+    id INTEGER PRIMARY KEY,
+    funcion TEXT NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'pendiente',
+    trabajador TEXT,
+    lease_hasta REAL,
+    intentos INTEGER NOT NULL DEFAULT 0,
+    reclamada REAL,
+    terminada REAL,
+    resultado TEXT
+);
+CREATE INDEX IF NOT EXISTS tareas_estado ON tareas (estado, lease_hasta);
+CREATE UNIQUE INDEX IF NOT EXISTS tareas_funcion ON tareas (funcion);
+"""
+
+
+class ColaTrabajo:
+    """
+    Cola de integrandos en un archivo SQLite compartido.
+
+    Estados: 'pendiente' → 'en_curso' (con lease) → estado final del
+    resultado ('resuelto', 'sin_resolver', 'error', 'tiempo_agotado', ...).
+    Una tarea cuyo lease vence más de `max_intentos` veces se da por fallida.
+    """
+
+    def __init__(self, ruta, duracion_lease=120.0, max_intentos=3):
+        self.ruta = ruta
+        self.duracion_lease = duracion_lease
+        self.max_intentos = max_intentos
+        # isolation_level=None: las transacciones se abren a mano con BEGIN IMMEDIATE
+        self._conexion = sqlite3.connect(ruta, timeout=60, isolation_level=None)
+        self._conexion.execute('PRAGMA journal_mode=WAL')
+        self._conexion.executescript(ESQUEMA)
+
+    def cerrar(self):
+        self._conexion.close()
+
+    def encolar(self, funciones: Iterable[str]) -> int:
+        """
+        Agrega integrandos como tareas pendientes y devuelve cuántas se
+        agregaron. Los que ya están en la cola (en cualquier estado) se
+        omiten, así volver a encolar el mismo archivo no duplica trabajo.
+        """
+        with self._transaccion():
+            cursor = self._conexion.executemany(
+                'INSERT OR IGNORE INTO tareas (funcion) VALUES (?)', ((f,) for f in funciones))
+        return cursor.rowcount
+
+    def reclamar(self, trabajador, tamano=8) -> List[Tuple[int, str]]:
+        """
+        Reclama hasta `tamano` tareas pendientes o con lease vencido. BEGIN
+        IMMEDIATE toma el bloqueo de escritura, así dos trabajadores nunca
+        reclaman la misma tarea.
+        """
+        ahora = time.time()
+        with self._transaccion():
+            # Las que ya agotaron sus intentos (el trabajador murió con ellas) se cierran
+            self._conexion.execute(
+                "UPDATE tareas SET estado = 'error', terminada = ?, resultado = ? "
+                "WHERE estado = 'en_curso' AND lease_hasta < ? AND intentos >= ?",
+                (ahora, json.dumps({'mensaje': 'Se agotaron los intentos'}), ahora,
+                 self.max_intentos))
+            filas = self._conexion.execute(
+                "SELECT id, funcion FROM tareas WHERE estado = 'pendiente' "
+                "OR (estado = 'en_curso' AND lease_hasta < ?) ORDER BY id LIMIT ?",
+                (ahora, tamano)).fetchall()
+            self._conexion.executemany(
+                "UPDATE tareas SET estado = 'en_curso', trabajador = ?, lease_hasta = ?, "
+                "intentos = intentos + 1, reclamada = ? WHERE id = ?",
+                ((trabajador, ahora + self.duracion_lease, ahora, id_) for id_, _ in filas))
+        return filas
+
+    def renovar(self, trabajador, ids):
+        """Extiende el lease de las tareas que el trabajador sigue procesando."""
+        with self._transaccion():
+            self._conexion.executemany(
+                "UPDATE tareas SET lease_hasta = ? "
+                "WHERE id = ? AND trabajador = ? AND estado = 'en_curso'",
+                ((time.time() + self.duracion_lease, id_, trabajador) for id_ in ids))
+
+    def completar(self, trabajador, id_, resultado: Dict) -> bool:
+        """
+        Guarda el resultado si el trabajador aún posee la tarea. Devuelve
+        False si el lease venció y otro trabajador la reclamó.
+        """
+        with self._transaccion():
+            cursor = self._conexion.execute(
+                "UPDATE tareas SET estado = ?, terminada = ?, resultado = ? "
+                "WHERE id = ? AND trabajador = ? AND estado = 'en_curso'",
+                (resultado['estado'], time.time(), json.dumps(resultado, ensure_ascii=False),
+                 id_, trabajador))
+        return cursor.rowcount == 1
+
+    def hay_trabajo(self) -> bool:
+        """True mientras quede alguna tarea pendiente o en curso."""
+        fila = self._conexion.execute(
+            "SELECT 1 FROM tareas WHERE estado IN ('pendiente', 'en_curso') LIMIT 1").fetchone()
+        return fila is not None
+
+    def progreso(self) -> Dict:
+        """Tareas por estado, trabajadores y rendimiento agregado (integrales/s)."""
+        por_estado = dict(self._conexion.execute(
+            'SELECT estado, COUNT(*) FROM tareas GROUP BY estado').fetchall())
+        inicio, fin, terminadas, trabajadores = self._conexion.execute(
+            'SELECT MIN(reclamada), MAX(terminada), COUNT(terminada), COUNT(DISTINCT trabajador) '
+            'FROM tareas').fetchone()
+        duracion = (fin - inicio) if inicio and fin else 0.0
+        return {
+            'por_estado': por_estado,
+            'total': sum(por_estado.values()),
+            'trabajadores': trabajadores,
+            'duracion': duracion,
+            'rendimiento': terminadas / duracion if duracion else 0.0,
+        }
+
+    def resultados(self):
+        """Resultados terminados en orden de encolado."""
+        for id_, funcion, estado, resultado in self._conexion.execute(
+                "SELECT id, funcion, estado, resultado FROM tareas "
+                "WHERE estado NOT IN ('pendiente', 'en_curso') ORDER BY id"):
+            dato = json.loads(resultado) if resultado else {}
+            if 'indice' not in dato:
+                dato = resultado_lote(id_, funcion, estado, mensaje=dato.get('mensaje'))
+            dato['indice'] = id_
+            yield dato
+
+    @contextlib.contextmanager
+    def _transaccion(self):
+        """BEGIN IMMEDIATE ... COMMIT, o ROLLBACK si algo falla."""
+        self._conexion.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self._conexion.execute('ROLLBACK')
+            raise
+        self._conexion.execute('COMMIT')
+
+
+# ---------- Trabajador ----------
+def nombre_trabajador() -> str:
+    """Identificador único entre máquinas: host y pid."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def trabajar(ruta, tamano_lote=8, timeout: Optional[float] = 30.0, duracion_lease=120.0,
+             memoria_mb: Optional[float] = None, espera=1.0) -> int:
+    """
+    Bucle de un trabajador: reclama bloques y los resuelve hasta que no
+    quede trabajo. Si sólo quedan tareas en curso de otros, espera por si
+    sus leases vencen. Devuelve cuántas integrales resolvió.
+    """
+    # El lease se renueva entre integrales: debe cubrir la más lenta permitida
+    if timeout and duracion_lease <= timeout:
+        raise ValueError("El lease debe ser mayor que el límite de tiempo por integral.")
+    inicializar_trabajador(None, memoria_mb)
+    cola = ColaTrabajo(ruta, duracion_lease)
+    trabajador = nombre_trabajador()
+    resueltas = 0
+    try:
+        while True:
+            bloque = cola.reclamar(trabajador, tamano_lote)
+            if not bloque:
+                if not cola.hay_trabajo():
+                    return resueltas
+                time.sleep(espera)
+                continue
+            for posicion, (id_, funcion) in enumerate(bloque):
+                resultado = resolver_en_proceso(id_, funcion, timeout)
+                resueltas += cola.completar(trabajador, id_, resultado)
+                # Mantener vivos los leases del resto del bloque
+                cola.renovar(trabajador, [i for i, _ in bloque[posicion + 1:]])
+    finally:
+        cola.cerrar()
+
+
+def trabajar_local(ruta, procesos=2, **opciones) -> Dict:
+    """
+    Lanza `procesos` trabajadores locales (cada uno hace de nodo) sobre la
+    misma cola y devuelve el progreso final con el rendimiento agregado.
+    """
+    hijos = [multiprocessing.Process(target=trabajar, args=(ruta,), kwargs=opciones)
+             for _ in range(procesos)]
+    for hijo in hijos:
+        hijo.start()
+    for hijo in hijos:
+        hijo.join()
+    cola = ColaTrabajo(ruta)
+    try:
+        return cola.progreso()
+    finally:
+        cola.cerrar()
+
+
+# ---------- Línea de comandos ----------
+def _mostrar_progreso(progreso):
+    estados = ', '.join(f"{estado}: {n}" for estado, n in sorted(progreso['por_estado'].items()))
+    print(f"    Tareas: {progreso['total']} ({estados})", file=sys.stderr)
+    print(f"    Trabajadores: {progreso['trabajadores']}, "
+          f"duración {progreso['duracion']:.2f} s, "
+          f"rendimiento {progreso['rendimiento']:.1f} integrales/s", file=sys.stderr)
+
+
+def _encolar_archivo(ruta, archivo) -> int:
+    with open(archivo, encoding='utf-8') as entrada:
+        funciones = [leer_integrando(linea) for linea in entrada if linea.strip()]
+    cola = ColaTrabajo(ruta)
+    try:
+        return cola.encolar(funciones)
+    finally:
+        cola.cerrar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    p_encolar = subparsers.add_parser('encolar', help='agregar integrandos JSONL a la cola')
+    p_encolar.add_argument('cola')
+    p_encolar.add_argument('entrada')
+
+    opciones_trabajo = argparse.ArgumentParser(add_help=False)
+    opciones_trabajo.add_argument('--lote', type=int, default=8, help='tareas por reclamo')
+    opciones_trabajo.add_argument('--timeout', type=float, default=30.0,
+                                  help='segundos por integral')
+    opciones_trabajo.add_argument('--lease', type=float, default=120.0,
+                                  help='segundos antes de que otro trabajador reclame la tarea')
+    opciones_trabajo.add_argument('--memoria-mb', type=float)
+
+    p_trabajar = subparsers.add_parser('trabajar', parents=[opciones_trabajo],
+                                       help='procesar la cola hasta vaciarla')
+    p_trabajar.add_argument('cola')
+
+    p_local = subparsers.add_parser('local', parents=[opciones_trabajo],
+                                    help='encolar y procesar con varios trabajadores locales')
+    p_local.add_argument('cola')
+    p_local.add_argument('entrada')
+    p_local.add_argument('--procesos', type=int, default=os.cpu_count() or 1)
+
+    p_estado = subparsers.add_parser('estado', help='progreso y rendimiento agregado')
+    p_estado.add_argument('cola')
+
+    p_exportar = subparsers.add_parser('exportar', help='resultados en JSONL por stdout')
+    p_exportar.add_argument('cola')
+
+    args = parser.parse_args()
+    if args.comando == 'encolar':
+        print(f"    Encoladas: {_encolar_archivo(args.cola, args.entrada)}", file=sys.stderr)
+        return
+    if args.comando in ('trabajar', 'local'):
+        opciones = {'tamano_lote': args.lote, 'timeout': args.timeout,
+                    'duracion_lease': args.lease, 'memoria_mb': args.memoria_mb}
+        if args.comando == 'trabajar':
+            resueltas = trabajar(args.cola, **opciones)
+            print(f"    {nombre_trabajador()}: {resueltas} integrales", file=sys.stderr)
+            return
+        print(f"    Encoladas: {_encolar_archivo(args.cola, args.entrada)}", file=sys.stderr)
+        _mostrar_progreso(trabajar_local(args.cola, args.procesos, **opciones))
+        return
+
+    cola = ColaTrabajo(args.cola)
+    try:
+        if args.comando == 'estado':
+            _mostrar_progreso(cola.progreso())
+        else:
+            for resultado in cola.resultados():
+                print(json.dumps(resultado, ensure_ascii=False))
+    finally:
+        cola.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -21,13 +21,29 @@
 import sympy as sp
 from sympy import symbols, sqrt, sin, cos, tan, sec, asin, atan, integrate
 from sympy import simplify, trigsimp, latex
-import re
-from typing import Tuple, Dict, Optional
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-import numpy as np
+from sympy.simplify.fu import TR1, TR2, TR5
+from typing import Tuple, Dict, List, Optional, Iterable
 import sys
 import math
+import cmath
+import argparse
+import json
+import os
+import time
+import signal
+import contextlib
+import cProfile
+import io
+import pstats
+import tracemalloc
+import heapq
+import pickle
+import multiprocessing
+import sqlite3
+from collections import OrderedDict, deque
+from functools import lru_cache
+from concurrent.futures import (ProcessPoolExecutor, Future, wait, FIRST_COMPLETED,
+                                TimeoutError as FuturesTimeoutError)
 
 # Símbolos globales
 x, a_sym, theta = symbols('x a theta', real=True, positive=True)
@@ -197,7 +213,35 @@ class TrianguloRectangulo:
             self.cateto_adyacente = str(self.a)
 
     def dibujar_triangulo(self, guardar=False, nombre_archivo='triangulo.png'):
-        fig, ax = plt.subplots(figsize=(8, 6))
+        if guardar:
+            # Sin pyplot: bytes renderizados fuera de pantalla y cacheados
+            with open(nombre_archivo, 'wb') as archivo:
+                archivo.write(self.renderizar(os.path.splitext(nombre_archivo)[1][1:] or 'png'))
+            print(f"\n    ✓ Triángulo guardado en '{nombre_archivo}'\n")
+            return
+
+        # Importación diferida: matplotlib sólo se carga al graficar
+        import matplotlib.pyplot as plt
+
+        fig = plt.figure(figsize=(8, 6))
+        self._dibujar_en(fig)
+        try:
+            plt.show()
+        finally:
+            plt.close(fig)
+
+    def renderizar(self, formato='png', dpi=150) -> bytes:
+        """
+        Renderiza el triángulo fuera de pantalla (backend Agg, sin pyplot) y
+        devuelve los bytes PNG/SVG. El resultado se cachea por (tipo, a).
+        """
+        return _renderizar_triangulo(self.tipo, self.a, formato, dpi)
+
+    def _dibujar_en(self, fig):
+        import matplotlib.patches as patches
+        import numpy as np
+
+        ax = fig.add_subplot()
         fig.patch.set_facecolor('#f8f9fa')
 
         if self.tipo == 'tipo1':
@@ -260,31 +304,865 @@ class TrianguloRectangulo:
         ax.axis('off')
 
         # Título y información
-        plt.title(titulo, fontsize=14, weight='bold', pad=20)
+        ax.set_title(titulo, fontsize=14, weight='bold', pad=20)
         
         info_box = f'Sustitución: {sustitucion}\nIdentidad: {identidad}'
         ax.text(0.1, 5.0, info_box, fontsize=10, 
                 bbox=dict(boxstyle='round,pad=0.8', facecolor='#f0fdf4', 
                          alpha=0.95, edgecolor='#22c55e', linewidth=2))
 
-        plt.tight_layout()
+        fig.tight_layout()
 
-        if guardar:
-            plt.savefig(nombre_archivo, dpi=150, bbox_inches='tight', facecolor='#f8f9fa')
-            print(f"\n    ✓ Triángulo guardado en '{nombre_archivo}'\n")
+@lru_cache(maxsize=256)
+def _renderizar_triangulo(tipo, a, formato='png', dpi=150) -> bytes:
+    """
+    Renderiza con una Figure independiente de pyplot: no queda registrada en
+    el gestor de figuras y se libera al salir, así la memoria no crece.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(8, 6))
+    FigureCanvasAgg(fig)
+    TrianguloRectangulo(tipo, a)._dibujar_en(fig)
+    salida = io.BytesIO()
+    fig.savefig(salida, format=formato, dpi=dpi, bbox_inches='tight', facecolor='#f8f9fa')
+    fig.clear()
+    return salida.getvalue()
+
+def renderizar_triangulos_lote(pares: Iterable, formato='png', dpi=150,
+                               max_procesos: Optional[int] = None) -> List[bytes]:
+    """
+    Renderiza muchos triángulos (tipo, a) en un pool de procesos. Los pares
+    repetidos se renderizan una sola vez; el orden de salida es el de entrada.
+    """
+    pares = [(tipo, float(a)) for tipo, a in pares]
+    if not pares:
+        return []
+    unicos = list(dict.fromkeys(pares))
+    with ProcessPoolExecutor(max_workers=max_procesos) as ejecutor:
+        renderizados = dict(zip(unicos, ejecutor.map(
+            _renderizar_triangulo, *zip(*unicos), [formato] * len(unicos), [dpi] * len(unicos))))
+    return [renderizados[par] for par in pares]
+
+# ---------- Detección estructural de patrones ----------
+def _es_exponente_semientero(exponente):
+    """True para exponentes ±1/2, ±3/2, ... (raíces cuadradas y sus potencias)."""
+    if not exponente.is_number:
+        return False
+    doble = 2 * sp.nsimplify(exponente) if exponente.is_Float else 2 * exponente
+    return doble.is_integer and not doble.is_even
+
+def clasificar_radicando(expresion, variable=x) -> Optional[Tuple[str, sp.Expr, sp.Expr]]:
+    """
+    Recorre el árbol de la expresión buscando un radicando c + k·x² y lo
+    clasifica en una sola pasada, sin convertir la expresión a texto.
+
+    Devuelve (tipo, a, escala) tal que el radicando es a² - (escala·x)²,
+    a² + (escala·x)² o (escala·x)² - a², con `a` exacto (puede ser irracional
+    o simbólico); o None si no hay un patrón reconocible.
+    """
+    x2 = variable**2
+    for nodo in sp.preorder_traversal(expresion):
+        if not (nodo.is_Pow and nodo.base.is_Add and _es_exponente_semientero(nodo.exp)):
+            continue
+        # Separar el radicando en c + k·x² término a término (más barato que Wild.match)
+        c, k = sp.Integer(0), sp.Integer(0)
+        for termino in nodo.base.args:
+            coef, resto = termino.as_independent(variable, as_Add=False)
+            if resto == 1:
+                c += coef
+            elif resto == x2:
+                k += coef
+            else:
+                break
         else:
-            plt.show()
+            if c == 0 or k == 0:
+                continue
+            if c.is_positive and k.is_negative:
+                tipo, a_cuadrado = 'tipo1', c
+            elif c.is_positive and k.is_positive:
+                tipo, a_cuadrado = 'tipo2', c
+            elif c.is_negative and k.is_positive:
+                tipo, a_cuadrado = 'tipo3', -c
+            else:
+                continue
+            return tipo, sqrt(a_cuadrado), sqrt(abs(k))
+
+    return None
+
+def forma_canonica(expresion, variable=x) -> Optional[Tuple[sp.Expr, sp.Expr]]:
+    """
+    Completa el cuadrado del primer radicando cuadrático con término lineal:
+    A·x² + B·x + C = A·(x + h)² + (C - A·h²), con h = B/(2A).
+
+    Devuelve (expresión en u = x + h, h), donde u se escribe con el mismo
+    símbolo `variable`; o None si ningún radicando está desplazado.
+    """
+    for nodo in sp.preorder_traversal(expresion):
+        if not (nodo.is_Pow and nodo.base.is_Add and _es_exponente_semientero(nodo.exp)):
+            continue
+        try:
+            polinomio = sp.Poly(nodo.base, variable)
+        except sp.PolynomialError:
+            continue
+        if polinomio.degree() != 2:
+            continue
+        A, B, _ = polinomio.all_coeffs()
+        if B == 0 or A.has(variable):
+            continue
+        h = B / (2 * A)
+        # Con el cambio x = u - h los radicandos quedan como c + k·u²
+        canonica = expresion.subs(variable, variable - h).replace(
+            lambda e: e.is_Pow and e.base.is_Add and _es_exponente_semientero(e.exp),
+            lambda e: sp.expand(e.base)**e.exp)
+        return canonica, h
+    return None
+
+# ---------- Reescritura dirigida con identidades pitagóricas ----------
+def radicando_patron(tipo, a, u):
+    """Radicando del patrón en términos de u = escala·x."""
+    if tipo == 'tipo1':
+        return a**2 - u**2
+    if tipo == 'tipo2':
+        return a**2 + u**2
+    return u**2 - a**2
+
+def lado_pitagorico(tipo, a):
+    """
+    Raíz del radicando tras la sustitución: √(a²cos²θ) = a·cos(θ), etc.
+    Es exacta porque θ ∈ [-π/2, π/2] (tipo1, tipo2) o θ ∈ [0, π/2) (tipo3).
+    """
+    if tipo == 'tipo1':
+        return a * cos(theta)
+    if tipo == 'tipo2':
+        return a * sec(theta)
+    return a * tan(theta)
+
+def relaciones_triangulo(tipo, a, u) -> Dict:
+    """sen(θ), cos(θ) y θ en función de u = escala·x, leídos del triángulo."""
+    if tipo == 'tipo1':
+        return {sin(theta): u/a, cos(theta): sqrt(a**2 - u**2)/a, theta: asin(u/a)}
+    if tipo == 'tipo2':
+        hipotenusa = sqrt(a**2 + u**2)
+        return {sin(theta): u/hipotenusa, cos(theta): a/hipotenusa, theta: atan(u/a)}
+    return {sin(theta): sqrt(u**2 - a**2)/u, cos(theta): a/u, theta: sp.acos(a/u)}
+
+def reescribir_radicales(expresion, tipo, a, escala, variable=x):
+    """
+    Reemplaza cada potencia del radicando por la del lado del triángulo,
+    (a² - u²)^e → (a·cos θ)^(2e), sin pasar por simplify().
+    """
+    radicando = sp.expand(radicando_patron(tipo, a, escala * variable))
+    lado = lado_pitagorico(tipo, a)
+    return expresion.replace(
+        lambda nodo: nodo.is_Pow and nodo.base.is_Add and sp.expand(nodo.base) == radicando,
+        lambda nodo: lado**(2 * nodo.exp))
+
+def a_seno_coseno(expresion):
+    """Expresa tan, sec, csc y cot en términos de sen y cos (TR1 y TR2 de fu)."""
+    return TR2(TR1(expresion))
+
+def desustituir_por_reglas(resultado_theta, tipo, a, u):
+    """
+    Vuelve a x con las relaciones del triángulo: expande ángulos múltiplos,
+    pasa a sen/cos, aplica la identidad pitagórica, sustituye sen, cos y θ,
+    y factoriza términos comunes.
+    """
+    # TR5: sen²θ → 1 - cos²θ, que cancela denominadores como 2·sen²θ - 2
+    expresion = TR5(a_seno_coseno(sp.expand_trig(resultado_theta)))
+    # sen(θ) ≤ 1: log(sen θ - 1) sólo difiere de log(1 - sen θ) en una constante
+    expresion = expresion.subs(sp.log(sin(theta) - 1), sp.log(1 - sin(theta)))
+    relaciones = relaciones_triangulo(tipo, a, u)
+    expresion = expresion.subs({sin(theta): relaciones[sin(theta)],
+                                cos(theta): relaciones[cos(theta)]})
+    return sp.factor_terms(expresion.subs(theta, relaciones[theta]))
+
+# ---------- Tabla de antiderivadas en forma cerrada ----------
+@lru_cache(maxsize=None)
+def integral_seno_coseno(p, q):
+    """
+    ∫ sen^p(θ)·cos^q(θ) dθ para enteros p, q (también negativos) mediante
+    las fórmulas de reducción clásicas, sin llamar a integrate().
+    """
+    s, c = sin(theta), cos(theta)
+    casos_base = {
+        (0, 0): theta,
+        (1, 0): -c,
+        (0, 1): s,
+        (1, 1): s**2 / 2,
+        (-1, 0): sp.log((1 - c) / s),
+        (0, -1): sp.log((1 + s) / c),
+        (1, -1): -sp.log(c),
+        (-1, 1): sp.log(s),
+        (-1, -1): sp.log(s / c),
+    }
+    if (p, q) in casos_base:
+        return casos_base[(p, q)]
+    if q >= 2 and p + q != 0:
+        return s**(p + 1) * c**(q - 1) / (p + q) + sp.Rational(q - 1, p + q) * integral_seno_coseno(p, q - 2)
+    if p >= 2 and p + q != 0:
+        return -s**(p - 1) * c**(q + 1) / (p + q) + sp.Rational(p - 1, p + q) * integral_seno_coseno(p - 2, q)
+    if q <= -2:
+        return -s**(p + 1) * c**(q + 1) / (q + 1) + sp.Rational(p + q + 2, q + 1) * integral_seno_coseno(p, q + 2)
+    return s**(p + 1) * c**(q + 1) / (p + 1) + sp.Rational(p + q + 2, p + 1) * integral_seno_coseno(p + 2, q)
+
+def exponentes_seno_coseno(expresion) -> Optional[Tuple[sp.Expr, int, int]]:
+    """Descompone c·sen^p(θ)·cos^q(θ) en (c, p, q); None si no tiene esa forma."""
+    coeficiente, resto = expresion.as_independent(theta, as_Add=False)
+    p = q = 0
+    for factor in sp.Mul.make_args(resto):
+        base, exponente = factor.as_base_exp()
+        if not exponente.is_Integer:
+            return None
+        if base == sin(theta):
+            p += int(exponente)
+        elif base == cos(theta):
+            q += int(exponente)
+        elif base != 1:
+            return None
+    return coeficiente, p, q
+
+@lru_cache(maxsize=None)
+def antiderivada_tabla(tipo, potencia_num, potencia_den, exponente_radical=-1):
+    """
+    Antiderivada genérica de x^potencia_num / x^potencia_den · R^(exponente_radical/2)
+    con R = a² - x², a² + x² o x² - a² según el tipo, en función de x y del
+    símbolo a_sym. Se deriva una vez con las fórmulas de reducción, se
+    simplifica y queda memoizada; para un `a` concreto basta sustituir a_sym.
+    """
+    m, k = potencia_num - potencia_den, exponente_radical
+    # Con x = a·sen θ (tipo1), a·tan θ (tipo2) o a·sec θ (tipo3) el integrando
+    # queda a^(m+k+1)·sen^p θ·cos^q θ
+    if tipo == 'tipo1':
+        p, q = m, k + 1
+    elif tipo == 'tipo2':
+        p, q = m, -(m + k + 2)
+    else:
+        p, q = k + 1, -(m + k + 2)
+    resultado_theta = a_sym**(m + k + 1) * integral_seno_coseno(p, q)
+    resultado = desustituir_por_reglas(resultado_theta, tipo, a_sym, x)
+    # Se simplifica una vez por entrada, sobre un símbolo sólo real: el x
+    # global es positivo y simplify() podría usarlo y romper la rama x < 0
+    real = sp.Dummy('x', real=True)
+    simplificado = sp.simplify(resultado.subs(x, real)).subs(real, x)
+    return min((simplificado, resultado), key=sp.count_ops)
+
+def precompilar_tabla(max_potencia=4, exponentes_radical=(-3, -1, 1, 3)):
+    """Llena la tabla para todas las potencias hasta `max_potencia`."""
+    for tipo in ('tipo1', 'tipo2', 'tipo3'):
+        for exponente in exponentes_radical:
+            for potencia in range(max_potencia + 1):
+                antiderivada_tabla(tipo, potencia, 0, exponente)
+                if potencia:
+                    antiderivada_tabla(tipo, 0, potencia, exponente)
+
+
+def buscar_en_tabla(funcion, tipo, a, escala, variable=x) -> Optional[sp.Expr]:
+    """
+    Si `funcion` es c·x^m·R^(k/2) para el radicando detectado, devuelve su
+    antiderivada a partir de la tabla; si no, None.
+    """
+    radicando = sp.expand(radicando_patron(tipo, a, escala * variable))
+    coeficiente, resto = funcion.as_independent(variable, as_Add=False)
+    m, k = 0, None
+    for factor in sp.Mul.make_args(resto):
+        base, exponente = factor.as_base_exp()
+        if base == variable and exponente.is_Integer:
+            m += int(exponente)
+        elif k is None and base.is_Add and sp.expand(base) == radicando \
+                and (2 * exponente).is_Integer and not (2 * exponente).is_even:
+            k = int(2 * exponente)
+        elif factor != 1:
+            return None
+    if k is None:
+        return None
+
+    # Escala: ∫ x^m·R(s·x)^(k/2) dx = s^-(m+1) · G(s·x), con G la fórmula para s = 1
+    generica = antiderivada_tabla(tipo, max(m, 0), max(-m, 0), k)
+    return coeficiente * escala**-(m + 1) * generica.subs(x, escala * variable).subs(a_sym, a)
+
+# ---------- Caché de integrales ----------
+class CacheIntegrales:
+    """
+    Caché de integrales indexada por la forma canónica (srepr) del integrando.
+
+    Tiene un nivel en memoria LRU limitado a `max_entradas` y un nivel
+    opcional en disco (SQLite) que sobrevive entre ejecuciones y puede
+    compartirse entre procesos.
+    """
+
+    def __init__(self, max_entradas=1024, ruta_disco=None):
+        self.max_entradas = max_entradas
+        self.ruta_disco = ruta_disco
+        self._memoria = OrderedDict()
+        self._conexion = None
+        self._pid_conexion = None
+        self.aciertos_memoria = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+
+    @staticmethod
+    def clave(expresion, variable):
+        """Forma canónica del par (integrando, variable de integración)."""
+        return sp.srepr(sp.sympify(expresion)) + '|' + sp.srepr(variable)
+
+    def _disco(self):
+        # Cada proceso abre su propia conexión: sqlite3 no se comparte tras fork.
+        if self.ruta_disco is None:
+            return None
+        if self._conexion is None or self._pid_conexion != os.getpid():
+            self._conexion = sqlite3.connect(self.ruta_disco, timeout=30)
+            self._conexion.execute('PRAGMA journal_mode=WAL')
+            self._conexion.execute(
+                'CREATE TABLE IF NOT EXISTS integrales (clave TEXT PRIMARY KEY, valor BLOB)')
+            self._pid_conexion = os.getpid()
+        return self._conexion
+
+    def obtener(self, clave):
+        """Devuelve el resultado guardado o None si no está en caché."""
+        if clave in self._memoria:
+            self._memoria.move_to_end(clave)
+            self.aciertos_memoria += 1
+            return self._memoria[clave]
+
+        conexion = self._disco()
+        if conexion is not None:
+            fila = conexion.execute(
+                'SELECT valor FROM integrales WHERE clave = ?', (clave,)).fetchone()
+            if fila is not None:
+                valor = pickle.loads(fila[0])
+                self._guardar_memoria(clave, valor)
+                self.aciertos_disco += 1
+                return valor
+
+        self.fallos += 1
+        return None
+
+    def guardar(self, clave, valor):
+        self._guardar_memoria(clave, valor)
+        conexion = self._disco()
+        if conexion is not None:
+            with conexion:
+                conexion.execute('INSERT OR REPLACE INTO integrales VALUES (?, ?)',
+                                 (clave, pickle.dumps(valor)))
+
+    def _guardar_memoria(self, clave, valor):
+        self._memoria[clave] = valor
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_entradas:
+            self._memoria.popitem(last=False)
+
+    def limpiar(self):
+        """Vacía el nivel en memoria y reinicia los contadores."""
+        self._memoria.clear()
+        self.aciertos_memoria = self.aciertos_disco = self.fallos = 0
+
+    def estadisticas(self) -> Dict:
+        consultas = self.aciertos_memoria + self.aciertos_disco + self.fallos
+        return {
+            'entradas_memoria': len(self._memoria),
+            'aciertos_memoria': self.aciertos_memoria,
+            'aciertos_disco': self.aciertos_disco,
+            'fallos': self.fallos,
+            'tasa_aciertos': (consultas - self.fallos) / consultas if consultas else 0.0,
+        }
+
+cache_integrales = CacheIntegrales()
+# Integrales en θ por expresión normalizada (sin factor constante), compartidas
+# entre integrandos en x distintos que llegan al mismo núcleo
+cache_theta = CacheIntegrales()
+
+def configurar_cache(max_entradas=1024, ruta_disco=None):
+    """Reemplaza las cachés globales, p. ej. para activar el nivel en disco."""
+    global cache_integrales, cache_theta
+    cache_integrales = CacheIntegrales(max_entradas, ruta_disco)
+    cache_theta = CacheIntegrales(max_entradas, ruta_disco)
+    return cache_integrales
+
+def estadisticas_cache() -> Dict:
+    """Aciertos por paso: integración en θ y resto de llamadas a integrate()."""
+    return {'integracion_theta': cache_theta.estadisticas(),
+            'integrate': cache_integrales.estadisticas()}
+
+def normalizar_theta(expresion) -> Tuple[sp.Expr, sp.Expr]:
+    """
+    Separa el integrando en θ como c·g(θ), con c libre de θ. Así 9·sen²θ y
+    4·sen²θ comparten el núcleo g = sen²θ.
+    """
+    return sp.factor_terms(expresion).as_independent(theta, as_Add=False)
+
+def integrar_con_cache(expresion, variable):
+    """integrate() memoizado en la caché global de integrales."""
+    clave = CacheIntegrales.clave(expresion, variable)
+    resultado = cache_integrales.obtener(clave)
+    if resultado is None:
+        resultado = integrate(expresion, variable)
+        cache_integrales.guardar(clave, resultado)
+    return resultado
+
+# ---------- Traza estructurada de pasos ----------
+class PasoTraza:
+    """
+    Registro de un paso del pipeline: nombre y expresión SymPy.
+    Las representaciones pretty/LaTeX se generan al pedirlas y no se guardan.
+    """
+
+    __slots__ = ('nombre', 'expresion', 'datos')
+
+    def __init__(self, nombre, expresion, datos=None):
+        self.nombre = nombre
+        self.expresion = expresion
+        self.datos = datos or {}
+
+    @property
+    def pretty(self):
+        from sympy.printing import pretty
+        return pretty(self.expresion, use_unicode=True)
+
+    @property
+    def latex(self):
+        return expr_a_latex_limpio(self.expresion)
+
+    def __repr__(self):
+        return f"PasoTraza({self.nombre!r}, {self.expresion!r})"
+
+class _Nodo(int):
+    """Identificador de una subexpresión internada en un AlmacenTrazas."""
+    __slots__ = ()
+
+class PasoCompacto:
+    """Paso de una traza almacenada: la expresión y los datos SymPy son _Nodo."""
+
+    __slots__ = ('nombre', 'nodo', 'datos')
+
+    def __init__(self, nombre, nodo, datos):
+        self.nombre = nombre
+        self.nodo = nodo
+        self.datos = datos
+
+class AlmacenTrazas:
+    """
+    Almacén compacto de trazas de auditoría para lotes grandes.
+
+    Las expresiones se internan por hash-consing: cada subexpresión distinta
+    se guarda una sola vez como (clase, ids de sus argumentos) y todas las
+    trazas la comparten. Las expresiones SymPy y sus representaciones se
+    reconstruyen bajo demanda.
+
+    Con `conservar=False` las trazas ya volcadas a disco con `volcar_jsonl`
+    se descartan; la memoria queda acotada por las subexpresiones distintas.
+    """
+
+    def __init__(self, conservar=True):
+        self.conservar = conservar
+        self._ids: Dict[tuple, int] = {}
+        self._nodos: List[tuple] = []
+        self._clases: List[type] = []
+        self._indice_clases: Dict[type, int] = {}
+        self._trazas: List[Tuple[PasoCompacto, ...]] = []
+        self._nodos_volcados = 0
+        self._trazas_volcadas = 0
+        self.total_trazas = 0
+
+    def __len__(self):
+        return self.total_trazas
+
+    def internar(self, expresion) -> _Nodo:
+        """Id de la expresión en la tabla, agregando las subexpresiones nuevas."""
+        memo = {}
+        for sub in sp.postorder_traversal(expresion):
+            if sub in memo:
+                continue
+            if sub.args:
+                clase = type(sub)
+                if clase not in self._indice_clases:
+                    self._indice_clases[clase] = len(self._clases)
+                    self._clases.append(clase)
+                clave = (self._indice_clases[clase],) + tuple(memo[arg] for arg in sub.args)
+            else:
+                clave = _clave_atomo(sub)
+            nodo = self._ids.get(clave)
+            if nodo is None:
+                nodo = self._ids[clave] = _Nodo(len(self._nodos))
+                self._nodos.append(clave)
+            memo[sub] = nodo
+        return memo[expresion]
+
+    def expresion(self, nodo) -> sp.Basic:
+        """Reconstruye la expresión SymPy de un nodo."""
+        memo = {}
+        pendientes = [nodo]
+        while pendientes:
+            actual = pendientes[-1]
+            clave = self._nodos[actual]
+            if isinstance(clave[0], str):
+                memo[actual] = _atomo_desde_clave(clave)
+                pendientes.pop()
+                continue
+            faltantes = [arg for arg in clave[1:] if arg not in memo]
+            if faltantes:
+                pendientes.extend(faltantes)
+                continue
+            memo[actual] = _reconstruir(self._clases[clave[0]], [memo[arg] for arg in clave[1:]])
+            pendientes.pop()
+        return memo[nodo]
+
+    def agregar(self, traza) -> int:
+        """Interna una traza (lista de PasoTraza) y devuelve su índice."""
+        compacta = []
+        for paso in traza:
+            datos = tuple((clave, self.internar(valor) if isinstance(valor, sp.Basic) else valor)
+                          for clave, valor in paso.datos.items())
+            compacta.append(PasoCompacto(sys.intern(paso.nombre),
+                                         self.internar(sp.sympify(paso.expresion)), datos))
+        self._trazas.append(tuple(compacta))
+        self.total_trazas += 1
+        return self.total_trazas - 1
+
+    def traza(self, indice) -> List[PasoTraza]:
+        """Traza `indice` como lista de PasoTraza (si aún está en memoria)."""
+        posicion = indice - self._trazas_volcadas if not self.conservar else indice
+        if not 0 <= posicion < len(self._trazas):
+            raise IndexError(f"La traza {indice} ya no está en memoria.")
+        return [PasoTraza(paso.nombre, self.expresion(paso.nodo),
+                          {clave: self.expresion(valor) if isinstance(valor, _Nodo) else valor
+                           for clave, valor in paso.datos})
+                for paso in self._trazas[posicion]]
+
+    def estadisticas(self) -> Dict:
+        return {'trazas': self.total_trazas, 'en_memoria': len(self._trazas),
+                'subexpresiones': len(self._nodos), 'clases': len(self._clases)}
+
+    # Formato JSONL: una línea por nodo nuevo ({"n", "c", "a"} o, para los
+    # átomos, {"n", "s": [tipo, ...]}) seguida de una línea por traza
+    # ({"t": [[nombre, nodo, datos], ...]}). Los datos SymPy van como {"e": nodo}.
+    def volcar_jsonl(self, archivo):
+        """Escribe en `archivo` (abierto en modo texto) lo que aún no se volcó."""
+        for nodo in range(self._nodos_volcados, len(self._nodos)):
+            clave = self._nodos[nodo]
+            if isinstance(clave[0], str):
+                registro = {'n': nodo, 's': clave}
+            else:
+                registro = {'n': nodo, 'c': self._clases[clave[0]].__name__, 'a': clave[1:]}
+            archivo.write(json.dumps(registro, separators=(',', ':')) + '\n')
+        self._nodos_volcados = len(self._nodos)
+
+        inicio = 0 if not self.conservar else self._trazas_volcadas
+        for traza in self._trazas[inicio:]:
+            pasos = [[paso.nombre, paso.nodo,
+                      {clave: {'e': valor} if isinstance(valor, _Nodo) else valor
+                       for clave, valor in paso.datos}]
+                     for paso in traza]
+            archivo.write(json.dumps({'t': pasos}, separators=(',', ':'),
+                                     ensure_ascii=False, default=str) + '\n')
+        if not self.conservar:
+            self._trazas_volcadas += len(self._trazas)
+            self._trazas = []
+        else:
+            self._trazas_volcadas = len(self._trazas)
+
+    @classmethod
+    def cargar_jsonl(cls, archivo):
+        """Reconstruye un almacén a partir de un volcado JSONL."""
+        almacen = cls()
+        for linea in archivo:
+            registro = json.loads(linea)
+            if 't' in registro:
+                almacen._trazas.append(tuple(
+                    PasoCompacto(sys.intern(nombre), _Nodo(nodo),
+                                 tuple((clave, _Nodo(valor['e']) if isinstance(valor, dict)
+                                        else valor) for clave, valor in datos.items()))
+                    for nombre, nodo, datos in registro['t']))
+                almacen.total_trazas += 1
+                continue
+            if 's' in registro:
+                clave = _tupla(registro['s'])
+                _atomo_desde_clave(clave)  # valida antes de aceptar el nodo
+            else:
+                clase = _clase_sympy(registro['c'])
+                if clase not in almacen._indice_clases:
+                    almacen._indice_clases[clase] = len(almacen._clases)
+                    almacen._clases.append(clase)
+                clave = (almacen._indice_clases[clase],) + tuple(registro['a'])
+            almacen._ids[clave] = _Nodo(registro['n'])
+            almacen._nodos.append(clave)
+        almacen._nodos_volcados = len(almacen._nodos)
+        almacen._trazas_volcadas = len(almacen._trazas)
+        return almacen
+
+def _reconstruir(clase, argumentos):
+    """
+    clase(*args) sin reevaluar, para obtener exactamente la expresión
+    internada (p. ej. Mul(4, Add) no debe distribuirse).
+    """
+    try:
+        return clase(*argumentos, evaluate=False)
+    except TypeError:
+        return clase(*argumentos)
+
+def _clase_sympy(nombre):
+    """
+    Clase de expresión SymPy por nombre, buscada en sympy y en
+    sympy.core.numbers. Cualquier otra cosa (funciones, módulos) se rechaza.
+    """
+    import sympy.core.numbers as numeros
+    for espacio in (sp, numeros):
+        clase = getattr(espacio, nombre, None)
+        if isinstance(clase, type) and issubclass(clase, sp.Basic):
+            return clase
+    raise ValueError(f"Clase SymPy desconocida en la traza: {nombre}")
+
+# Los átomos se guardan en forma estructurada y se reconstruyen explícitamente,
+# sin eval: un volcado JSONL puede venir de fuera y no debe ejecutar código.
+def _clave_atomo(atomo) -> tuple:
+    """Clave hashable (tipo, datos...) de un átomo SymPy."""
+    from sympy.core.singleton import Singleton
+    from mpmath.libmp import to_pickable
+
+    if isinstance(type(atomo), Singleton):
+        return ('S', type(atomo).__name__)
+    if isinstance(atomo, sp.Integer):
+        return ('Integer', int(atomo))
+    if isinstance(atomo, sp.Rational):
+        return ('Rational', int(atomo.p), int(atomo.q))
+    if isinstance(atomo, sp.Float):
+        return ('Float',) + tuple(to_pickable(atomo._mpf_)) + (atomo._prec,)
+    if isinstance(atomo, sp.Symbol):
+        asunciones = tuple(sorted(atomo.assumptions0.items()))
+        return (type(atomo).__name__, sys.intern(atomo.name), asunciones)
+    raise ValueError(f"Átomo SymPy no soportado en la traza: {type(atomo).__name__}")
+
+def _atomo_desde_clave(clave):
+    """Inversa de _clave_atomo; lanza ValueError ante claves desconocidas."""
+    from sympy.core.singleton import Singleton
+
+    tipo, datos = clave[0], clave[1:]
+    try:
+        if tipo == 'S':
+            nombre = datos[0]
+            atomo = getattr(sp.S, nombre, None) if not nombre.startswith('_') else None
+            if isinstance(type(atomo), Singleton) and isinstance(atomo, sp.Atom):
+                return atomo
+        elif tipo == 'Integer':
+            return sp.Integer(int(datos[0]))
+        elif tipo == 'Rational':
+            return sp.Rational(int(datos[0]), int(datos[1]))
+        elif tipo == 'Float':
+            signo, mantisa, exponente, bits, precision = datos
+            return sp.Float((int(signo), str(mantisa), int(exponente), int(bits)),
+                            precision=int(precision))
+        elif tipo in ('Symbol', 'Dummy'):
+            nombre, asunciones = datos
+            clase = sp.Symbol if tipo == 'Symbol' else sp.Dummy
+            return clase(str(nombre), **{str(k): bool(v) for k, v in asunciones})
+    except (TypeError, ValueError, AttributeError) as e:
+        raise ValueError(f"Átomo inválido en la traza: {clave!r}") from e
+    raise ValueError(f"Átomo inválido en la traza: {clave!r}")
+
+def _tupla(valor):
+    """Listas JSON anidadas → tuplas (las claves del almacén deben ser hashables)."""
+    return tuple(_tupla(v) for v in valor) if isinstance(valor, list) else valor
+
+def mostrar_traza(traza):
+    """Renderiza en consola una traza obtenida en modo silencioso."""
+    for numero, paso in enumerate(traza, 1):
+        mostrar_titulo_seccion(paso.nombre, numero)
+        mostrar_formula(paso.nombre, paso.expresion, paso.latex)
+
+# ---------- Instrumentación por paso ----------
+class HookCProfile:
+    """Hook de instrumentación: perfil cProfile de cada paso."""
+
+    def __init__(self, lineas=15, orden='cumulative'):
+        self.lineas = lineas
+        self.orden = orden
+        self._perfil = None
+
+    def antes(self, paso):
+        self._perfil = cProfile.Profile()
+        self._perfil.enable()
+
+    def despues(self, paso):
+        self._perfil.disable()
+        salida = io.StringIO()
+        pstats.Stats(self._perfil, stream=salida).sort_stats(self.orden).print_stats(self.lineas)
+        return {'perfil': salida.getvalue()}
+
+class HookTracemalloc:
+    """Hook de instrumentación: pico de memoria asignada durante cada paso."""
+
+    def antes(self, paso):
+        self._iniciado_aqui = not tracemalloc.is_tracing()
+        if self._iniciado_aqui:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+    def despues(self, paso):
+        _, pico = tracemalloc.get_traced_memory()
+        if self._iniciado_aqui:
+            tracemalloc.stop()
+        return {'memoria_pico': pico}
+
+class Instrumentacion:
+    """
+    Mide cada paso del pipeline: tiempo con perf_counter y tamaño de las
+    expresiones (count_ops) antes y después. Los hooks opcionales reciben
+    antes(paso) / despues(paso) y pueden añadir datos al registro del paso.
+    """
+
+    def __init__(self, hooks=None, medir_tamano=True):
+        self.hooks = list(hooks or [])
+        self.medir_tamano = medir_tamano
+        self.registros: List[Dict] = []
+
+    @staticmethod
+    def _tamano(valor):
+        if isinstance(valor, sp.Basic):
+            return sp.count_ops(valor)
+        if isinstance(valor, (tuple, list)):
+            return sum(Instrumentacion._tamano(v) for v in valor)
+        return 0
+
+    def medir(self, paso, funcion, *args):
+        registro = {'paso': paso}
+        if self.medir_tamano:
+            registro['ops_entrada'] = self._tamano(args)
+        for hook in self.hooks:
+            hook.antes(paso)
+
+        inicio = time.perf_counter()
+        try:
+            resultado = funcion(*args)
+        except Exception as e:
+            registro['error'] = str(e)
+            raise
+        finally:
+            registro['duracion'] = time.perf_counter() - inicio
+            for hook in reversed(self.hooks):
+                registro.update(hook.despues(paso) or {})
+            self.registros.append(registro)
+
+        if self.medir_tamano:
+            registro['ops_salida'] = self._tamano(resultado)
+        return resultado
+
+    def reporte(self) -> Dict:
+        """Reporte estructurado: registros por paso y tiempo total."""
+        return {
+            'pasos': self.registros,
+            'total': sum(r['duracion'] for r in self.registros),
+        }
+
+    def mostrar_reporte(self):
+        """Imprime el reporte de tiempos como tabla."""
+        total = sum(r['duracion'] for r in self.registros) or 1.0
+        print(f"    {'Paso':<28}{'tiempo (ms)':>12}{'%':>7}{'ops entrada':>13}{'ops salida':>12}")
+        linea(largo=76)
+        for r in self.registros:
+            print(f"    {r['paso']:<28}{r['duracion'] * 1000:>12.2f}{100 * r['duracion'] / total:>7.1f}"
+                  f"{r.get('ops_entrada', ''):>13}{r.get('ops_salida', ''):>12}")
 
 # ---------- Clase principal mejorada ----------
+# Niveles de detalle de resolver() y su latencia p50 medida con
+# `benchmark.py niveles` (funciones predefinidas, salida descartada, sin caché):
+#   'basico'     sólo el resultado: sin pasos, LaTeX, gráfico ni verificación   ~5 ms
+#   'detallado'  pasos en texto (pretty) y verificación numérica               ~55 ms
+#   'completo'   además LaTeX, figura del triángulo y gráficas de f y F        ~130 ms
+# 'completo' paga además ~300 ms la primera vez por importar matplotlib, más
+# el tiempo de dibujar la ventana con un backend interactivo.
+NIVELES_DETALLE = ('basico', 'detallado', 'completo')
+
 class SustitucionTrigonometricaInteractiva:
-    def __init__(self, funcion, variable=x):
+    def __init__(self, funcion, variable=x, silencioso=False, instrumentacion=None,
+                 simplificacion='reglas', usar_tabla=True, verificacion='numerica',
+                 completar_cuadrado=True, nivel_detalle='completo', graficos=True):
         self.funcion = funcion
         self.variable = variable
+        # Radicandos A·x² + B·x + C: se resuelve en u = x + desplazamiento
+        # sobre funcion_canonica y el cambio se deshace al desustituir.
+        self.completar_cuadrado = completar_cuadrado
+        self.funcion_canonica = funcion
+        self.desplazamiento = sp.Integer(0)
         self.tipo_sustitucion = None
         self.parametro_a = None
+        self.escala = sp.Integer(1)
         self.triangulo = None
+        # En modo silencioso no se imprime ni se construye pretty()/latex():
+        # cada paso queda en self.traza y se renderiza bajo demanda.
+        self.silencioso = silencioso
+        if nivel_detalle not in NIVELES_DETALLE:
+            raise ValueError(f"nivel_detalle debe ser uno de {NIVELES_DETALLE}")
+        self.nivel_detalle = nivel_detalle
+        self.mostrar_pasos = not silencioso and nivel_detalle != 'basico'
+        # Con False el nivel 'completo' no abre ventanas de matplotlib (p. ej.
+        # en un subproceso con límite de tiempo); las figuras quedan al llamador.
+        self.graficos = graficos
+        self.traza: List[PasoTraza] = []
+        self.error = None
+        self.resultado_final = None
+        self._antiderivada_compilada = None
+        self._integrando_compilado = None
+        # Instrumentación opcional por paso; con None no añade costo
+        self.instrumentacion = instrumentacion
+        # 'reglas': sólo las reescrituras conocidas de cada patrón.
+        # 'generica': además simplify()/trigsimp() en cada paso (más lento).
+        if simplificacion not in ('reglas', 'generica'):
+            raise ValueError("simplificacion debe ser 'reglas' o 'generica'")
+        self.simplificacion = simplificacion
+        # Consultar la tabla de antiderivadas antes de llamar a integrate()
+        self.usar_tabla = usar_tabla
+        # 'numerica': derivar una vez y comparar en puntos aleatorios (rápido).
+        # 'simbolica': además integrar directamente con SymPy y comparar.
+        if verificacion not in ('numerica', 'simbolica'):
+            raise ValueError("verificacion debe ser 'numerica' o 'simbolica'")
+        self.verificacion = verificacion
+        self.veredicto: Optional[Dict] = None
+
+    def _registrar(self, nombre, expresion, **datos):
+        """Agrega un paso a la traza estructurada."""
+        paso = PasoTraza(nombre, expresion, datos)
+        self.traza.append(paso)
+        return paso
+
+    def _ejecutar_paso(self, nombre, metodo, *args):
+        if self.instrumentacion is None:
+            return metodo(*args)
+        return self.instrumentacion.medir(nombre, metodo, *args)
+
+    def _latex(self, expresion, antes='', despues=''):
+        """LaTeX de la expresión sólo en el nivel 'completo'; si no, None."""
+        if self.nivel_detalle != 'completo':
+            return None
+        return antes + latex(expresion) + despues
 
     def detectar_tipo_sustitucion(self) -> Optional[str]:
+        if self.mostrar_pasos:
+            self._mostrar_funcion_original()
+
+        patron = clasificar_radicando(self.funcion, self.variable)
+        if not patron and self.completar_cuadrado:
+            canonica = forma_canonica(self.funcion, self.variable)
+            if canonica:
+                self.funcion_canonica, self.desplazamiento = canonica
+                patron = clasificar_radicando(self.funcion_canonica, self.variable)
+        if patron:
+            self.tipo_sustitucion, self.parametro_a, self.escala = patron
+            self._registrar("Detección del patrón", self.funcion_canonica,
+                            tipo=self.tipo_sustitucion, a=self.parametro_a, escala=self.escala,
+                            desplazamiento=self.desplazamiento)
+            if self.mostrar_pasos:
+                self._mostrar_patron_detectado()
+            return self.tipo_sustitucion
+
+        self.funcion_canonica, self.desplazamiento = self.funcion, sp.Integer(0)
+
+        self._registrar("Detección del patrón", self.funcion, tipo=None, a=None)
+        if self.mostrar_pasos:
+            mostrar_contenido("Advertencia", "No se detectó un patrón estándar automáticamente.")
+        return None
+
+    def _mostrar_funcion_original(self):
         mostrar_titulo_seccion("Análisis y Detección del Patrón", 1)
         
         mostrar_subtitulo("Función Original")
@@ -301,74 +1179,70 @@ class SustitucionTrigonometricaInteractiva:
         print(f"    ∫ ─────────────── dx")
         print()
         
-        latex_limpio = expr_a_latex_limpio(self.funcion)
-        mostrar_formula("Expresión LaTeX", None, r'\int ' + latex_limpio + r' \, dx')
-
-        func_str = str(self.funcion)
+        if self.nivel_detalle == 'completo':
+            latex_limpio = expr_a_latex_limpio(self.funcion)
+            mostrar_formula("Expresión LaTeX", None, r'\int ' + latex_limpio + r' \, dx')
 
-        # Patrones de detección
-        patron1 = re.search(r'sqrt\(\s*([0-9]+(?:\.[0-9]+)?)\s*-\s*x\*\*2\s*\)', func_str)
-        patron2 = re.search(r'sqrt\(\s*([0-9]+(?:\.[0-9]+)?)\s*\+\s*x\*\*2\s*\)', func_str)
-        patron3 = re.search(r'sqrt\(\s*x\*\*2\s*-\s*([0-9]+(?:\.[0-9]+)?)\s*\)', func_str)
-
-        if patron1:
-            a_cuadrado = int(float(patron1.group(1)))
-            self.parametro_a = sp.Integer(int(math.sqrt(a_cuadrado)))
-            self.tipo_sustitucion = 'tipo1'
-            
+    def _mostrar_patron_detectado(self):
+        if self.desplazamiento != 0:
+            u = self.variable + self.desplazamiento
+            mostrar_caja_info("Completar el cuadrado", (
+                f"Cambio de variable: u = {u}   (du = dx)\n"
+                f"Integral equivalente: ∫ {self.funcion_canonica.subs(self.variable, sp.Symbol('u'))} du\n"
+                f"En lo que sigue, x representa a u."
+            ))
+        a = self.parametro_a
+        a_cuadrado = a**2
+        # Radicando escalado: a² - k²x² se resuelve con k·x en lugar de x
+        kx = 'x' if self.escala == 1 else f'({self.escala}·x)'
+        if self.tipo_sustitucion == 'tipo1':
             info = (
-                f"Forma detectada: √(a² - x²)\n"
-                f"Donde: a² = {a_cuadrado}  →  a = {self.parametro_a}\n\n"
-                f"Sustitución a usar: x = {self.parametro_a}·sen(θ)\n"
+                f"Forma detectada: √(a² - {kx}²)\n"
+                f"Donde: a² = {a_cuadrado}  →  a = {a}\n\n"
+                f"Sustitución a usar: {kx} = {a}·sen(θ)\n"
                 f"Identidad pitagórica: 1 - sen²(θ) = cos²(θ)"
             )
             mostrar_caja_info("✓ PATRÓN TIPO 1", info)
-            return 'tipo1'
-
-        if patron2:
-            a_cuadrado = int(float(patron2.group(1)))
-            self.parametro_a = sp.Integer(int(math.sqrt(a_cuadrado)))
-            self.tipo_sustitucion = 'tipo2'
-            
+        elif self.tipo_sustitucion == 'tipo2':
             info = (
-                f"Forma detectada: √(a² + x²)\n"
-                f"Donde: a² = {a_cuadrado}  →  a = {self.parametro_a}\n\n"
-                f"Sustitución a usar: x = {self.parametro_a}·tan(θ)\n"
+                f"Forma detectada: √(a² + {kx}²)\n"
+                f"Donde: a² = {a_cuadrado}  →  a = {a}\n\n"
+                f"Sustitución a usar: {kx} = {a}·tan(θ)\n"
                 f"Identidad pitagórica: 1 + tan²(θ) = sec²(θ)"
             )
             mostrar_caja_info("✓ PATRÓN TIPO 2", info)
-            return 'tipo2'
-
-        if patron3:
-            a_cuadrado = int(float(patron3.group(1)))
-            self.parametro_a = sp.Integer(int(math.sqrt(a_cuadrado)))
-            self.tipo_sustitucion = 'tipo3'
-            
+        else:
             info = (
-                f"Forma detectada: √(x² - a²)\n"
-                f"Donde: a² = {a_cuadrado}  →  a = {self.parametro_a}\n\n"
-                f"Sustitución a usar: x = {self.parametro_a}·sec(θ)\n"
+                f"Forma detectada: √({kx}² - a²)\n"
+                f"Donde: a² = {a_cuadrado}  →  a = {a}\n\n"
+                f"Sustitución a usar: {kx} = {a}·sec(θ)\n"
                 f"Identidad pitagórica: sec²(θ) - 1 = tan²(θ)"
             )
             mostrar_caja_info("✓ PATRÓN TIPO 3", info)
-            return 'tipo3'
-
-        mostrar_contenido("Advertencia", "No se detectó un patrón estándar automáticamente.")
-        return None
 
     def construir_triangulo_rectangulo(self):
+        self.triangulo = TrianguloRectangulo(self.tipo_sustitucion, self.parametro_a)
+        if not self.mostrar_pasos:
+            return
+
         mostrar_titulo_seccion("Construcción del Triángulo Rectángulo", 2)
         
         mostrar_subtitulo("Representación Geométrica")
         print("    El triángulo rectángulo nos ayuda a visualizar las relaciones trigonométricas")
         print("    y facilita el proceso de sustitución y desustitución.\n")
         
-        self.triangulo = TrianguloRectangulo(self.tipo_sustitucion, self.parametro_a)
-        
-        try:
-            self.triangulo.dibujar_triangulo()
-        except Exception as e:
-            print(f"    ⚠ Advertencia: No se pudo mostrar el triángulo gráficamente.")
+        if self.nivel_detalle != 'completo':
+            # Nivel 'detallado': los lados en texto, sin matplotlib
+            mostrar_contenido("Hipotenusa", self.triangulo.hipotenusa)
+            mostrar_contenido("Cateto opuesto", self.triangulo.cateto_opuesto)
+            mostrar_contenido("Cateto adyacente", self.triangulo.cateto_adyacente)
+            return
+
+        if self.graficos:
+            try:
+                self.triangulo.dibujar_triangulo()
+            except Exception as e:
+                print(f"    ⚠ Advertencia: No se pudo mostrar el triángulo gráficamente.")
         
         mostrar_subtitulo("Verificación del Teorema de Pitágoras")
         
@@ -382,38 +1256,55 @@ class SustitucionTrigonometricaInteractiva:
         print(f"    LaTeX: {latex_pitagoras}\n")
 
     def aplicar_sustitucion(self):
-        mostrar_titulo_seccion("Aplicación de la Sustitución Trigonométrica", 3)
-        
+        # Con radicando escalado (c - k²x²) la sustitución es k·x = a·sen(θ)
+        coef = self.parametro_a / self.escala
         if self.tipo_sustitucion == 'tipo1':
-            x_sust = self.parametro_a * sin(theta)
-            dx_sust = self.parametro_a * cos(theta)
+            x_sust = coef * sin(theta)
+            dx_sust = coef * cos(theta)
         elif self.tipo_sustitucion == 'tipo2':
-            x_sust = self.parametro_a * tan(theta)
-            dx_sust = self.parametro_a * sec(theta)**2
+            x_sust = coef * tan(theta)
+            dx_sust = coef * sec(theta)**2
         else:
-            x_sust = self.parametro_a * sec(theta)
-            dx_sust = self.parametro_a * sec(theta) * tan(theta)
+            x_sust = coef * sec(theta)
+            dx_sust = coef * sec(theta) * tan(theta)
 
-        mostrar_subtitulo("Sustituciones")
-        mostrar_formula("Variable x", x_sust, f'x = {latex(x_sust)}')
-        mostrar_formula("Diferencial dx", dx_sust, f'dx = {latex(dx_sust)} \\, d\\theta')
+        if self.mostrar_pasos:
+            mostrar_titulo_seccion("Aplicación de la Sustitución Trigonométrica", 3)
+            mostrar_subtitulo("Sustituciones")
+            mostrar_formula("Variable x", x_sust, self._latex(x_sust, 'x = '))
+            mostrar_formula("Diferencial dx", dx_sust,
+                            self._latex(dx_sust, 'dx = ', r' \, d\theta'))
 
-        func_sustituida = sp.simplify(self.funcion.subs(self.variable, x_sust))
+        func_sustituida = reescribir_radicales(self.funcion_canonica, self.tipo_sustitucion,
+                                               self.parametro_a, self.escala, self.variable)
+        func_sustituida = func_sustituida.subs(self.variable, x_sust)
+        if self.simplificacion == 'generica':
+            func_sustituida = sp.simplify(func_sustituida)
         expresion_completa = func_sustituida * dx_sust
+        self._registrar("Aplicación de la sustitución", expresion_completa,
+                        x_sust=x_sust, dx_sust=dx_sust)
         
-        mostrar_subtitulo("Integral Transformada")
-        mostrar_formula("Nueva integral en θ", expresion_completa, 
-                       r'\int ' + latex(expresion_completa) + r' \, d\theta')
+        if self.mostrar_pasos:
+            mostrar_subtitulo("Integral Transformada")
+            mostrar_formula("Nueva integral en θ", expresion_completa, 
+                           self._latex(expresion_completa, r'\int ', r' \, d\theta'))
 
         return func_sustituida, dx_sust
 
     def simplificar_con_pitagoras(self, expresion):
-        mostrar_titulo_seccion("Simplificación con Identidades Pitagóricas", 4)
-        
-        mostrar_subtitulo("Expresión Antes de Simplificar")
-        print(f"    {sp.pretty(expresion)}\n")
+        if self.mostrar_pasos:
+            mostrar_titulo_seccion("Simplificación con Identidades Pitagóricas", 4)
+            
+            mostrar_subtitulo("Expresión Antes de Simplificar")
+            print(f"    {sp.pretty(expresion)}\n")
+
+        expr_simplificada = a_seno_coseno(expresion)
+        if self.simplificacion == 'generica':
+            expr_simplificada = trigsimp(simplify(expr_simplificada))
+        self._registrar("Simplificación con identidades pitagóricas", expr_simplificada)
 
-        expr_simplificada = trigsimp(simplify(expresion))
+        if not self.mostrar_pasos:
+            return expr_simplificada
 
         if self.tipo_sustitucion == 'tipo1':
             explicacion = (
@@ -443,29 +1334,76 @@ class SustitucionTrigonometricaInteractiva:
         mostrar_caja_info("Proceso de Simplificación", explicacion)
         
         mostrar_subtitulo("Resultado Simplificado")
-        mostrar_formula("Expresión simplificada", expr_simplificada, latex(expr_simplificada))
+        mostrar_formula("Expresión simplificada", expr_simplificada,
+                        self._latex(expr_simplificada))
 
         return expr_simplificada
 
     def integrar_en_theta(self, expresion):
-        mostrar_titulo_seccion("Integración en la Variable θ", 5)
-        
-        mostrar_subtitulo("Integral a Resolver")
-        mostrar_formula("Integrando", expresion, r'\int ' + latex(expresion) + r' \, d\theta')
+        if self.mostrar_pasos:
+            mostrar_titulo_seccion("Integración en la Variable θ", 5)
+            
+            mostrar_subtitulo("Integral a Resolver")
+            mostrar_formula("Integrando", expresion,
+                            self._latex(expresion, r'\int ', r' \, d\theta'))
         
-        integral_theta = integrate(expresion, theta)
+        # Un acierto en la caché de núcleos sólo deja pendiente la desustitución
+        coeficiente, nucleo = normalizar_theta(expresion)
+        clave = CacheIntegrales.clave(nucleo, theta)
+        integral_nucleo = cache_theta.obtener(clave)
+        acierto = integral_nucleo is not None
+        if not acierto:
+            integral_nucleo = self._integrar_nucleo(nucleo)
+            cache_theta.guardar(clave, integral_nucleo)
+        integral_theta = coeficiente * integral_nucleo
+        self._registrar("Integración en θ", integral_theta, acierto_cache=acierto)
         
-        mostrar_subtitulo("Resultado de la Integración")
-        mostrar_formula("Antiderivada en θ", integral_theta, latex(integral_theta) + r' + C')
+        if self.mostrar_pasos:
+            mostrar_subtitulo("Resultado de la Integración")
+            mostrar_formula("Antiderivada en θ", integral_theta,
+                            self._latex(integral_theta, despues=r' + C'))
         
         return integral_theta
 
+    def _integrar_nucleo(self, nucleo):
+        # Por linealidad, una suma de monomios sen^p·cos^q se integra con la tabla
+        # (p. ej. el numerador x + h que deja completar el cuadrado)
+        monomios = None
+        if self.usar_tabla:
+            monomios = [exponentes_seno_coseno(termino)
+                        for termino in sp.Add.make_args(sp.expand(nucleo))]
+        if monomios and all(monomios):
+            return sp.Add(*(c * integral_seno_coseno(p, q) for c, p, q in monomios))
+        return integrate(nucleo, theta)
+
     def desustituir(self, resultado_theta):
+        if self.mostrar_pasos:
+            self._mostrar_relaciones_triangulo()
+
+        resultado_final = desustituir_por_reglas(resultado_theta, self.tipo_sustitucion,
+                                                 self.parametro_a, self.escala * x)
+        if self.simplificacion == 'generica':
+            resultado_final = simplify(resultado_final)
+        resultado_final = self._deshacer_desplazamiento(resultado_final)
+        self._registrar("Desustitución", resultado_final)
+        
+        if self.mostrar_pasos:
+            mostrar_subtitulo("Expresión Final en x")
+            mostrar_formula("Resultado", resultado_final,
+                            self._latex(resultado_final, despues=r' + C'))
+        
+        return resultado_final
+
+    def _deshacer_desplazamiento(self, resultado):
+        """Vuelve de u = x + h a x en un resultado de la forma canónica."""
+        if self.desplazamiento == 0:
+            return resultado
+        return resultado.subs(self.variable, self.variable + self.desplazamiento)
+
+    def _mostrar_relaciones_triangulo(self):
         mostrar_titulo_seccion("Desustitución: Retorno a la Variable Original x", 6)
         
         mostrar_subtitulo("Relaciones Trigonométricas del Triángulo")
-        
-        resultado_x = resultado_theta
 
         if self.tipo_sustitucion == 'tipo1':
             relaciones = (
@@ -474,10 +1412,6 @@ class SustitucionTrigonometricaInteractiva:
             )
             latex_rel = (f'\\sin(\\theta) = \\frac{{x}}{{{self.parametro_a}}}, \\quad '
                         f'\\cos(\\theta) = \\frac{{\\sqrt{{{self.parametro_a}^2 - x^2}}}}{{{self.parametro_a}}}')
-            
-            resultado_x = resultado_x.subs(sin(theta), x/self.parametro_a)
-            resultado_x = resultado_x.subs(cos(theta), sqrt(self.parametro_a**2 - x**2)/self.parametro_a)
-            
         elif self.tipo_sustitucion == 'tipo2':
             relaciones = (
                 f"tan(θ) = x/{self.parametro_a}\n"
@@ -485,10 +1419,6 @@ class SustitucionTrigonometricaInteractiva:
             )
             latex_rel = (f'\\tan(\\theta) = \\frac{{x}}{{{self.parametro_a}}}, \\quad '
                         f'\\sec(\\theta) = \\frac{{\\sqrt{{{self.parametro_a}^2 + x^2}}}}{{{self.parametro_a}}}')
-            
-            resultado_x = resultado_x.subs(tan(theta), x/self.parametro_a)
-            resultado_x = resultado_x.subs(sec(theta), sqrt(self.parametro_a**2 + x**2)/self.parametro_a)
-            
         else:
             relaciones = (
                 f"sec(θ) = x/{self.parametro_a}\n"
@@ -496,34 +1426,53 @@ class SustitucionTrigonometricaInteractiva:
             )
             latex_rel = (f'\\sec(\\theta) = \\frac{{x}}{{{self.parametro_a}}}, \\quad '
                         f'\\tan(\\theta) = \\frac{{\\sqrt{{x^2 - {self.parametro_a}^2}}}}{{{self.parametro_a}}}')
-            
-            resultado_x = resultado_x.subs(sec(theta), x/self.parametro_a)
-            resultado_x = resultado_x.subs(tan(theta), sqrt(x**2 - self.parametro_a**2)/self.parametro_a)
 
         print(f"    {relaciones}")
-        print(f"\n    LaTeX: {latex_rel}\n")
+        if self.nivel_detalle == 'completo':
+            print(f"\n    LaTeX: {latex_rel}\n")
 
-        resultado_final = simplify(resultado_x)
-        
-        mostrar_subtitulo("Expresión Final en x")
-        mostrar_formula("Resultado", resultado_final, latex(resultado_final) + r' + C')
-        
-        return resultado_final
+    def resolver_pasos(self):
+        """
+        Ejecuta el pipeline detección → sustitución → simplificación →
+        integración → desustitución. Lanza excepción si algún paso falla.
+        """
+        tipo = self._ejecutar_paso('deteccion', self.detectar_tipo_sustitucion)
+        if not tipo:
+            raise ValueError("No se detectó un patrón estándar para sustitución trigonométrica.")
+
+        # Sin pasos que mostrar, las familias x^m·R^(k/2) salen directo de la tabla
+        if not self.mostrar_pasos and self.usar_tabla:
+            resultado = self._ejecutar_paso('tabla', buscar_en_tabla, self.funcion_canonica, tipo,
+                                            self.parametro_a, self.escala, self.variable)
+            if resultado is not None:
+                resultado = self._deshacer_desplazamiento(resultado)
+                self._registrar("Tabla de antiderivadas", resultado)
+                self.resultado_final = resultado
+                return resultado
+
+        self._ejecutar_paso('triangulo', self.construir_triangulo_rectangulo)
+        func_sust, dx_sust = self._ejecutar_paso('sustitucion', self.aplicar_sustitucion)
+        expresion_completa = func_sust * dx_sust
+        expr_simplificada = self._ejecutar_paso('simplificacion', self.simplificar_con_pitagoras,
+                                                expresion_completa)
+        resultado_theta = self._ejecutar_paso('integracion', self.integrar_en_theta,
+                                              expr_simplificada)
+        self.resultado_final = self._ejecutar_paso('desustitucion', self.desustituir,
+                                                   resultado_theta)
+        return self.resultado_final
 
     def resolver(self):
+        if self.silencioso:
+            try:
+                return self.resolver_pasos()
+            except Exception as e:
+                self.error = str(e)
+                return None
+
         try:
             mostrar_titulo_principal("🧮 RESOLUCIÓN DE INTEGRAL POR SUSTITUCIÓN TRIGONOMÉTRICA")
             
-            tipo = self.detectar_tipo_sustitucion()
-            if not tipo:
-                raise ValueError("No se detectó un patrón estándar para sustitución trigonométrica.")
-
-            self.construir_triangulo_rectangulo()
-            func_sust, dx_sust = self.aplicar_sustitucion()
-            expresion_completa = func_sust * dx_sust
-            expr_simplificada = self.simplificar_con_pitagoras(expresion_completa)
-            resultado_theta = self.integrar_en_theta(expr_simplificada)
-            resultado_final = self.desustituir(resultado_theta)
+            resultado_final = self.resolver_pasos()
 
             # Resultado final destacado
             mostrar_titulo_principal("✓ RESULTADO FINAL DE LA INTEGRAL")
@@ -537,15 +1486,43 @@ class SustitucionTrigonometricaInteractiva:
             mostrar_resultado_destacado(
                 "",
                 resultado_final,
-                latex(resultado_final) + r' + C'
+                self._latex(resultado_final, despues=r' + C')
             )
 
+            if self.nivel_detalle == 'basico':
+                return resultado_final
+
             # Verificación
-            mostrar_titulo_seccion("Verificación con SymPy", "✓")
-            mostrar_subtitulo("Integración Directa")
-            verificacion = integrate(self.funcion, x)
-            mostrar_formula("Resultado de SymPy", verificacion, latex(verificacion) + r' + C')
-            
+            mostrar_titulo_seccion("Verificación", "✓")
+            # Una verificación fallida no invalida el resultado ya obtenido
+            try:
+                veredicto = self._ejecutar_paso('verificacion', self.verificar)
+            except Exception as e:
+                veredicto = {'metodo': self.verificacion, 'valido': None, 'mensaje': str(e)}
+            if 'referencia' in veredicto:
+                mostrar_subtitulo("Integración Directa")
+                referencia = veredicto['referencia']
+                mostrar_formula("Resultado de SymPy", referencia,
+                                self._latex(referencia, despues=r' + C'))
+            mostrar_contenido("Método", veredicto['metodo'])
+            if veredicto.get('parametros'):
+                mostrar_contenido("Valores de muestra", veredicto['parametros'])
+            if veredicto['valido'] is None:
+                mostrar_contenido("Resultado", f"? no concluyente ({veredicto['mensaje']})")
+            else:
+                if veredicto['metodo'] == 'numerica':
+                    mostrar_contenido("Puntos aleatorios", veredicto['puntos'])
+                    mostrar_contenido("Error máximo", f"{veredicto['error_maximo']:.3e}")
+                mostrar_contenido("Resultado",
+                                  "✓ correcto" if veredicto['valido'] else "✗ no coincide")
+
+            if self.nivel_detalle == 'completo' and self.graficos:
+                mostrar_titulo_seccion("Gráficas de f(x) y F(x)", "📈")
+                try:
+                    self.graficar()
+                except Exception:
+                    print("    ⚠ Advertencia: No se pudieron mostrar las gráficas.")
+
             return resultado_final
 
         except Exception as e:
@@ -553,20 +1530,1329 @@ class SustitucionTrigonometricaInteractiva:
             print(f"    {str(e)}\n")
             return None
 
+    def limite_en_theta(self, limite) -> sp.Expr:
+        """
+        Transforma un límite en x al ángulo θ con la sustitución inversa:
+        asin(u/a), atan(u/a) o asec(u/a) = acos(a/u), con u = escala·(x + h).
+        Lanza ValueError si el límite queda fuera del dominio del patrón.
+        """
+        u = self.escala * (sp.sympify(limite) + self.desplazamiento)
+        a = self.parametro_a
+        if not (u.is_comparable and a.is_comparable):
+            raise ValueError(f"No se puede ubicar el límite {limite} en el dominio: "
+                             "el límite y el parámetro a deben ser números reales.")
+        if self.tipo_sustitucion == 'tipo1':
+            if abs(u) > a:
+                raise ValueError(f"El límite {limite} está fuera del dominio |u| ≤ {a}.")
+            return asin(u / a)
+        if self.tipo_sustitucion == 'tipo2':
+            return atan(u / a)
+        # θ ∈ [0, π/2) sólo cubre la rama u ≥ a, donde √(u² - a²) = a·tan(θ)
+        if u < a:
+            raise ValueError(f"El límite {limite} está fuera del dominio u ≥ {a}.")
+        return sp.acos(a / u)
+
+    def resolver_definida(self, lim_inf, lim_sup) -> Dict:
+        """
+        Integral definida sin volver a x: integra en θ, transforma los límites
+        con limite_en_theta y evalúa la antiderivada en θ. Devuelve
+        {'exacto', 'valor', 'limites_theta'}; en los extremos donde la
+        antiderivada no está definida se toma el límite lateral.
+        """
+        lim_inf, lim_sup = sp.sympify(lim_inf), sp.sympify(lim_sup)
+        # Con límites simbólicos las comparaciones de abajo no tienen valor de verdad
+        for limite in (lim_inf, lim_sup):
+            if not limite.is_comparable:
+                raise ValueError(f"Los límites deben ser números reales; {limite} no lo es.")
+        tipo = self._ejecutar_paso('deteccion', self.detectar_tipo_sustitucion)
+        if not tipo:
+            raise ValueError("No se detectó un patrón estándar para sustitución trigonométrica.")
+        theta_inf, theta_sup = self.limite_en_theta(lim_inf), self.limite_en_theta(lim_sup)
+        interiores = [p for p in sp.singularities(self.funcion, self.variable)
+                      if p.is_real and min(lim_inf, lim_sup) < p < max(lim_inf, lim_sup)]
+        if interiores:
+            raise ValueError(f"El integrando no está definido en {interiores[0]}, "
+                             "dentro del intervalo de integración.")
+
+        self._ejecutar_paso('triangulo', self.construir_triangulo_rectangulo)
+        func_sust, dx_sust = self._ejecutar_paso('sustitucion', self.aplicar_sustitucion)
+        expr_simplificada = self._ejecutar_paso('simplificacion', self.simplificar_con_pitagoras,
+                                                func_sust * dx_sust)
+        antiderivada = self._ejecutar_paso('integracion', self.integrar_en_theta,
+                                           expr_simplificada)
+        exacto = self._ejecutar_paso('evaluacion', self._evaluar_entre, antiderivada,
+                                     theta_inf, theta_sup)
+        valor = complex(sp.N(exacto))
+        if not cmath.isfinite(valor):
+            raise ValueError("La integral diverge en el intervalo dado.")
+        if abs(valor.imag) > 1e-12 * max(1.0, abs(valor.real)):
+            raise ValueError("La evaluación en θ no dio un valor real.")
+        self._registrar("Evaluación en los límites θ", exacto,
+                        theta_inf=theta_inf, theta_sup=theta_sup)
+        return {'exacto': exacto, 'valor': valor.real, 'limites_theta': (theta_inf, theta_sup)}
+
+    @staticmethod
+    def _evaluar_entre(antiderivada, theta_inf, theta_sup):
+        """
+        F(θ_sup) - F(θ_inf). Las inversas son crecientes: el límite lateral
+        en θ_sup se toma por la izquierda y en θ_inf por la derecha.
+        """
+        def evaluar(punto, direccion):
+            valor = antiderivada.subs(theta, punto)
+            if valor.has(sp.zoo, sp.nan, sp.oo, -sp.oo):
+                valor = sp.limit(antiderivada, theta, punto, direccion)
+            return valor
+        if theta_inf == theta_sup:
+            return sp.Integer(0)
+        if theta_inf > theta_sup:
+            return -SustitucionTrigonometricaInteractiva._evaluar_entre(
+                antiderivada, theta_sup, theta_inf)
+        return evaluar(theta_sup, '-') - evaluar(theta_inf, '+')
+
+    def resolver_hiperbolica(self):
+        """
+        Estrategia alternativa con sustitución hiperbólica sobre el patrón ya
+        detectado: u = a·tanh(t), a·sinh(t) o a·cosh(t) para los tipos 1, 2 y
+        3, con u = escala·x. Devuelve la antiderivada en x.
+        """
+        if self.tipo_sustitucion is None:
+            raise ValueError("Se requiere un patrón detectado para la sustitución hiperbólica.")
+        t = sp.Symbol('t', positive=True)
+        a, coef = self.parametro_a, self.parametro_a / self.escala
+        if self.tipo_sustitucion == 'tipo1':
+            x_sust, lado, inversa = coef * sp.tanh(t), a * sp.sech(t), sp.atanh
+        elif self.tipo_sustitucion == 'tipo2':
+            x_sust, lado, inversa = coef * sp.sinh(t), a * sp.cosh(t), sp.asinh
+        else:
+            x_sust, lado, inversa = coef * sp.cosh(t), a * sp.sinh(t), sp.acosh
+
+        radicando = sp.expand(radicando_patron(self.tipo_sustitucion, a, self.escala * self.variable))
+        integrando = self.funcion_canonica.replace(
+            lambda nodo: nodo.is_Pow and nodo.base.is_Add and sp.expand(nodo.base) == radicando,
+            lambda nodo: lado**(2 * nodo.exp))
+        integrando = integrando.subs(self.variable, x_sust) * sp.diff(x_sust, t)
+        if integrando.has(sp.sech):
+            # integrate() resuelve mejor sech en forma exponencial
+            integrando = integrando.rewrite(sp.exp)
+        integral_t = sp.expand_trig(integrar_con_cache(integrando, t))
+        resultado = integral_t.subs(t, inversa(self.escala * self.variable / a))
+        self._registrar("Sustitución hiperbólica", resultado, x_sust=x_sust)
+        return self._deshacer_desplazamiento(resultado)
+
+    def verificar(self, puntos=32, tolerancia=1e-8, semilla=None) -> Dict:
+        """
+        Comprueba que d/dx del resultado reproduce el integrando.
+
+        En modo 'numerica' deriva una sola vez, compila ambas expresiones con
+        lambdify y las compara en `puntos` valores aleatorios de x > 0 dentro
+        del dominio del patrón (error relativo). Los demás símbolos libres
+        (p. ej. b en sqrt(b**2 - x**2)) toman valores de muestra, que quedan
+        en 'parametros'; si aun así no se puede evaluar, el veredicto es no
+        concluyente ('valido' None) en lugar de un error. En modo 'simbolica'
+        integra de nuevo con SymPy y exige que la derivada de la diferencia sea 0.
+        """
+        if self.resultado_final is None:
+            raise ValueError("La integral no está resuelta; llame antes a resolver().")
+
+        if self.verificacion == 'simbolica':
+            referencia = integrar_con_cache(self.funcion, self.variable)
+            diferencia = sp.simplify(sp.diff(self.resultado_final - referencia, self.variable))
+            self.veredicto = {'metodo': 'simbolica', 'valido': diferencia == 0,
+                              'referencia': referencia}
+            return self.veredicto
+
+        import numpy as np
+
+        parametros = self._valores_muestra()
+        try:
+            derivada = sp.lambdify(
+                self.variable, sp.diff(self.resultado_final.subs(parametros), self.variable),
+                modules='numpy')
+            integrando = sp.lambdify(self.variable, self.funcion.subs(parametros),
+                                     modules='numpy')
+
+            # Interior del dominio con u > 0, lejos de los extremos donde R(x) se anula
+            minimo, maximo = self.dominio_valido(parametros)
+            minimo = max(minimo, 0.0)
+            limite = (self._a_float(self.parametro_a / self.escala, parametros)
+                      if self.parametro_a is not None else 1.0)
+            if math.isinf(maximo):
+                maximo = minimo + 4 * limite
+            margen = 0.05 * (maximo - minimo)
+            valores = np.random.default_rng(semilla).uniform(minimo + margen, maximo - margen,
+                                                             puntos)
+            valores -= self._a_float(self.desplazamiento, parametros)
+
+            with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+                esperado = np.broadcast_to(integrando(valores), valores.shape).astype(complex)
+                obtenido = np.broadcast_to(derivada(valores), valores.shape).astype(complex)
+        except (TypeError, ValueError, NameError, NotImplementedError) as e:
+            # Funciones indefinidas u otros objetos que NumPy no sabe evaluar
+            self.veredicto = {'metodo': 'numerica', 'valido': None, 'error_maximo': math.nan,
+                              'puntos': 0, 'parametros': parametros,
+                              'mensaje': "No se pudo evaluar numéricamente: "
+                                         + str(e).splitlines()[0]}
+            return self.veredicto
+        # Se descartan los polos del integrando (p. ej. x = 0 en 1/x)
+        finitos = np.isfinite(esperado)
+        errores = np.abs(obtenido[finitos] - esperado[finitos]) / np.maximum(1.0, np.abs(esperado[finitos]))
+        error_maximo = float(np.max(errores)) if errores.size else math.inf
+        self.veredicto = {'metodo': 'numerica', 'valido': bool(error_maximo <= tolerancia),
+                          'error_maximo': error_maximo, 'puntos': int(finitos.sum()),
+                          'parametros': parametros}
+        return self.veredicto
+
+    def _valores_muestra(self) -> Dict[sp.Symbol, sp.Expr]:
+        """
+        Valores numéricos para los símbolos libres distintos de x (y de θ):
+        3/2, 5/2, ... en orden alfabético, negativos si el símbolo lo exige.
+        """
+        libres = self.funcion.free_symbols | self.resultado_final.free_symbols
+        if self.parametro_a is not None:
+            libres |= sp.sympify(self.parametro_a).free_symbols
+        libres -= {self.variable, theta}
+        valores = {}
+        for k, simbolo in enumerate(sorted(libres, key=str)):
+            valor = sp.Rational(3, 2) + k
+            valores[simbolo] = -valor if simbolo.is_negative or simbolo.is_nonpositive else valor
+        return valores
+
+    @staticmethod
+    def _a_float(expresion, valores=None) -> float:
+        """float() de `expresion` tras sustituir `valores`; ValueError si sigue siendo simbólica."""
+        numero = sp.sympify(expresion).subs(valores or {})
+        if not numero.is_comparable:
+            raise ValueError(f"{numero} depende de parámetros simbólicos sin valor numérico.")
+        return float(numero)
+
+    def dominio_valido(self, valores=None) -> Tuple[float, float]:
+        """
+        Intervalo (mínimo, máximo) de u = x + desplazamiento donde vale la
+        antiderivada: |u| ≤ a para tipo1, cualquier u para tipo2 y u ≥ a para
+        tipo3, porque x = a·sec(θ) con θ ∈ [0, π/2) sólo cubre esa rama (como
+        en limite_en_theta). Sin patrón detectado, cualquier u.
+
+        Si a depende de otros símbolos, `valores` les da valor numérico; sin
+        ellos se lanza ValueError.
+        """
+        if self.tipo_sustitucion is None:
+            return -math.inf, math.inf
+        limite = self._a_float(self.parametro_a / self.escala, valores)
+        if self.tipo_sustitucion == 'tipo1':
+            return -limite, limite
+        if self.tipo_sustitucion == 'tipo3':
+            return limite, math.inf
+        return -math.inf, math.inf
+
+    def compilar_antiderivada(self):
+        """
+        Compila el resultado de desustituir() con lambdify en una función
+        vectorizada de NumPy. Devuelve NaN fuera del dominio del patrón.
+        """
+        if self._antiderivada_compilada is not None:
+            return self._antiderivada_compilada
+        if self.resultado_final is None:
+            raise ValueError("La integral no está resuelta; llame antes a resolver().")
+        if theta in self.resultado_final.free_symbols:
+            raise ValueError("La antiderivada aún depende de θ; la desustitución fue incompleta.")
+
+        self._antiderivada_compilada = self._vectorizar(self.resultado_final,
+                                                        self.dominio_valido())
+        return self._antiderivada_compilada
+
+    def compilar_integrando(self):
+        """
+        Integrando f(x) compilado con lambdify. Sin máscara de rama: f es
+        real en todo su dominio (también u ≤ -a en tipo3) y fuera da NaN.
+        """
+        if self._integrando_compilado is None:
+            self._integrando_compilado = self._vectorizar(self.funcion)
+        return self._integrando_compilado
+
+    def _vectorizar(self, expresion, dominio=None):
+        """lambdify de `expresion` en x; con `dominio`, NaN para u fuera de él."""
+        import numpy as np
+
+        evaluar = sp.lambdify(self.variable, expresion, modules='numpy')
+
+        def vectorizada(valores):
+            valores = np.asarray(valores, dtype=float)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                resultado = np.broadcast_to(evaluar(valores), valores.shape).astype(float)
+            if dominio is None:
+                return resultado
+            u = valores + self._a_float(self.desplazamiento)
+            return np.where((u >= dominio[0]) & (u <= dominio[1]), resultado, np.nan)
+
+        return vectorizada
+
+    def integral_definida_vectorizada(self, limites_inferiores, limites_superiores):
+        """
+        Evalúa F(b) - F(a) para arreglos de límites sin bucles en Python.
+        Los pares con algún límite fuera del dominio devuelven NaN.
+        """
+        antiderivada = self.compilar_antiderivada()
+        return antiderivada(limites_superiores) - antiderivada(limites_inferiores)
+
+    def intervalo_grafica(self) -> Tuple[float, float]:
+        """
+        Intervalo en x que se grafica: todo el dominio |u| ≤ a para tipo1 y
+        |u| ≤ 3a para tipo2 y tipo3 (u = x + desplazamiento; a = 1 sin patrón).
+        Requiere a numérico (ValueError si no).
+        """
+        limite = self._a_float(self.parametro_a / self.escala) if self.tipo_sustitucion else 1.0
+        if self.tipo_sustitucion != 'tipo1':
+            limite *= 3
+        h = self._a_float(self.desplazamiento)
+        return -limite - h, limite - h
+
+    def singularidades(self) -> List[float]:
+        """
+        Puntos reales donde f o F pueden divergir: los bordes del dominio real
+        del radicando (x = ±a - h en tipo1 y tipo3) y las raíces reales de las
+        bases polinómicas del denominador del integrando. Requiere a numérico.
+        """
+        import numpy as np
+
+        puntos = set()
+        if self.tipo_sustitucion in ('tipo1', 'tipo3'):
+            limite = self._a_float(self.parametro_a / self.escala)
+            h = self._a_float(self.desplazamiento)
+            puntos.update((limite - h, -limite - h))
+
+        for factor in sp.Mul.make_args(sp.denom(sp.together(self.funcion))):
+            base = factor.base if factor.is_Pow else factor
+            if not base.has(self.variable) or not base.is_polynomial(self.variable):
+                continue
+            try:
+                coeficientes = [float(c) for c in sp.Poly(base, self.variable).all_coeffs()]
+            except (TypeError, sp.PolynomialError):
+                continue
+            if len(coeficientes) > 1:
+                raices = np.roots(coeficientes)
+                puntos.update(round(float(r.real), 12) for r in raices if abs(r.imag) < 1e-12)
+        return sorted(puntos)
+
+    def muestrear_curvas(self, pixeles=800, alto_px=300, singularidades=None) -> Dict:
+        """
+        Muestrea f y F con muestrear_adaptativo() y las reduce a `pixeles`
+        columnas. Devuelve {'f': ..., 'F': ...}, cada una con xs, ys, rango_y
+        y evaluaciones (puntos evaluados antes de la reducción).
+        """
+        izquierda, derecha = self.intervalo_grafica()
+        if singularidades is None:
+            singularidades = self.singularidades()
+        curvas = {}
+        for nombre, funcion in (('f', self.compilar_integrando()),
+                                ('F', self.compilar_antiderivada())):
+            xs, ys, rango_y = muestrear_adaptativo(funcion, izquierda, derecha, pixeles, alto_px,
+                                                   singularidades)
+            evaluaciones = xs.size
+            xs, ys = reducir_a_pixeles(xs, ys, pixeles)
+            curvas[nombre] = {'xs': xs, 'ys': ys, 'rango_y': rango_y,
+                              'evaluaciones': evaluaciones}
+        return curvas
+
+    def graficar(self, archivo=None, ancho_px=800, alto_px=600, dpi=100) -> Dict:
+        """
+        Grafica f(x) y F(x) sobre el dominio válido. Con `archivo` renderiza
+        fuera de pantalla (Agg, sin pyplot) y lo guarda en el formato de su
+        extensión; sin él, lo muestra con pyplot. Devuelve las curvas.
+        """
+        if self.resultado_final is None:
+            raise ValueError("La integral no está resuelta; llame antes a resolver().")
+        # Dos paneles apilados: cada uno ocupa la mitad de la altura
+        singularidades = self.singularidades()
+        curvas = self.muestrear_curvas(ancho_px, alto_px // 2, singularidades)
+        tamano = (ancho_px / dpi, alto_px / dpi)
+
+        if archivo is not None:
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+            fig = Figure(figsize=tamano, dpi=dpi)
+            FigureCanvasAgg(fig)
+            self._dibujar_curvas_en(fig, curvas, singularidades)
+            fig.savefig(archivo, dpi=dpi, facecolor='#f8f9fa')
+            fig.clear()
+            return curvas
+
+        import matplotlib.pyplot as plt
+
+        fig = plt.figure(figsize=tamano, dpi=dpi)
+        self._dibujar_curvas_en(fig, curvas, singularidades)
+        try:
+            plt.show()
+        finally:
+            plt.close(fig)
+        return curvas
+
+    def _dibujar_curvas_en(self, fig, curvas, singularidades):
+        fig.patch.set_facecolor('#f8f9fa')
+        eje_f, eje_F = fig.subplots(2, 1, sharex=True)
+        izquierda, derecha = self.intervalo_grafica()
+        for eje, nombre, color, titulo in (
+                (eje_f, 'f', '#2563eb', f'f(x) = {self.funcion}'),
+                (eje_F, 'F', '#dc2626', f'F(x) = {self.resultado_final}')):
+            curva = curvas[nombre]
+            eje.plot(curva['xs'], curva['ys'], color=color, linewidth=1.5)
+            eje.set_ylim(*curva['rango_y'])
+            eje.set_title(titulo if len(titulo) <= 90 else titulo[:87] + '...', fontsize=9)
+            eje.axhline(0, color='#9ca3af', linewidth=0.8)
+            eje.grid(True, alpha=0.3)
+            for punto in singularidades:
+                if izquierda <= punto <= derecha:
+                    eje.axvline(punto, color='#6b7280', linestyle='--', linewidth=0.8)
+        eje_F.set_xlim(izquierda, derecha)
+        eje_F.set_xlabel('x')
+        # Márgenes fijos: tight_layout() obliga a un dibujado extra por figura
+        fig.subplots_adjust(left=0.08, right=0.97, top=0.94, bottom=0.09, hspace=0.25)
+
+    @classmethod
+    def resolver_lote(cls, funciones: Iterable, max_procesos: Optional[int] = None,
+                      timeout: Optional[float] = None,
+                      ruta_cache: Optional[str] = None,
+                      memoria_mb: Optional[float] = None) -> List[Dict]:
+        """
+        Resuelve muchas integrales en paralelo, sin interacción.
+
+        Cada integrando (texto o expresión SymPy) se envía a un proceso de un
+        ProcessPoolExecutor. Devuelve una lista de diccionarios en el mismo
+        orden de entrada. `timeout` es el límite en segundos por integral y
+        `ruta_cache` activa en los trabajadores la caché SQLite compartida.
+        `memoria_mb` limita el espacio de direcciones de cada trabajador; una
+        integral que lo agota queda con estado 'memoria_agotada'.
+        """
+        funciones = [f if isinstance(f, str) else str(f) for f in funciones]
+        if not funciones:
+            return []
+
+        # Con SIGALRM el límite se aplica dentro del proceso trabajador, que
+        # queda libre para la siguiente integral. Sin él, sólo se deja de esperar.
+        limite_en_proceso = timeout if hasattr(signal, 'setitimer') else None
+        limite_espera = None if limite_en_proceso is not None else timeout
+
+        resultados = []
+        with ProcessPoolExecutor(max_workers=max_procesos, initializer=inicializar_trabajador,
+                                 initargs=(ruta_cache, memoria_mb)) as ejecutor:
+            futuros = [ejecutor.submit(resolver_en_proceso, indice, func_str, limite_en_proceso)
+                       for indice, func_str in enumerate(funciones)]
+            for indice, (func_str, futuro) in enumerate(zip(funciones, futuros)):
+                try:
+                    resultados.append(futuro.result(timeout=limite_espera))
+                except FuturesTimeoutError:
+                    futuro.cancel()
+                    resultados.append(resultado_lote(indice, func_str, 'tiempo_agotado',
+                                                     mensaje=f"Superó el límite de {timeout} s"))
+                except Exception as e:
+                    resultados.append(resultado_lote(indice, func_str, 'error', mensaje=str(e)))
+        return resultados
+
+
+# ---------- Familias con parámetro simbólico ----------
+class FamiliaParametrica:
+    """
+    Familia de integrales que sólo difieren en el parámetro a del radicando.
+
+    Se resuelve una sola vez con `a_sym` simbólico; cada a concreto se obtiene
+    por sustitución (`instanciar`) o evaluando la antiderivada compilada sobre
+    (x, a) con NumPy (`evaluar`), sin volver a integrar.
+    """
+
+    def __init__(self, plantilla, variable=x):
+        if a_sym not in plantilla.free_symbols:
+            raise ValueError("La plantilla debe depender del parámetro simbólico a.")
+        self.plantilla = plantilla
+        self.variable = variable
+        self.antiderivada = None
+        self._compilada = None
+        # (tipo, a, escala) del radicando, para enmascarar la rama de tipo3
+        self.patron = clasificar_radicando(plantilla, variable)
+
+    @classmethod
+    def desde_integrando(cls, funcion, variable=x):
+        """
+        Generaliza un integrando concreto reemplazando su radicando a² ± (k·x)²
+        por el de `a_sym`. El resto de la expresión no se modifica.
+        """
+        patron = clasificar_radicando(funcion, variable)
+        if not patron:
+            raise ValueError("No se detectó un patrón estándar para sustitución trigonométrica.")
+        tipo, a, escala = patron
+        concreto = sp.expand(radicando_patron(tipo, a, escala * variable))
+        return cls(funcion.subs(concreto, radicando_patron(tipo, a_sym, escala * variable)),
+                   variable)
+
+    def resolver(self) -> sp.Expr:
+        """Antiderivada genérica en (x, a), calculada una vez y guardada en caché."""
+        if self.antiderivada is None:
+            clave = CacheIntegrales.clave(self.plantilla, self.variable) + '|familia'
+            antiderivada = cache_integrales.obtener(clave)
+            if antiderivada is None:
+                antiderivada = SustitucionTrigonometricaInteractiva(
+                    self.plantilla, self.variable, silencioso=True).resolver_pasos()
+                cache_integrales.guardar(clave, antiderivada)
+            self.antiderivada = antiderivada
+        return self.antiderivada
+
+    def instanciar(self, a) -> sp.Expr:
+        """Antiderivada para un valor concreto de a (sustitución, sin integrar)."""
+        return self.resolver().subs(a_sym, a)
+
+    def compilar(self):
+        """Compila la antiderivada genérica con lambdify sobre (x, a)."""
+        if self._compilada is None:
+            self._compilada = sp.lambdify((self.variable, a_sym), self.resolver(),
+                                          modules='numpy')
+        return self._compilada
+
+    def evaluar(self, valores_x, valores_a):
+        """
+        F(x; a) vectorizada con difusión de NumPy: p. ej. un x por cada a, o
+        una malla completa con valores_x[:, None] y valores_a[None, :].
+        Fuera del dominio del patrón devuelve NaN; en tipo3 eso incluye la
+        rama escala·x ≤ -a, que x = a·sec(θ) no cubre.
+        """
+        import numpy as np
+
+        valores_x, valores_a = np.broadcast_arrays(np.asarray(valores_x, dtype=float),
+                                                   np.asarray(valores_a, dtype=float))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            resultado = np.broadcast_to(self.compilar()(valores_x, valores_a),
+                                        valores_x.shape).astype(float)
+        if self.patron and self.patron[0] == 'tipo3':
+            _, a, escala = self.patron
+            limite = sp.lambdify(a_sym, a, modules='numpy')(valores_a)
+            resultado = np.where(float(escala) * valores_x >= limite, resultado, np.nan)
+        return resultado
+
+    def integral_definida(self, lim_inf, lim_sup, valores_a):
+        """F(lim_sup; a) - F(lim_inf; a) para un arreglo de valores de a."""
+        return self.evaluar(lim_sup, valores_a) - self.evaluar(lim_inf, valores_a)
+
+
+# ---------- Gráficas adaptativas de f y F ----------
+def _rango_robusto(valores):
+    """Rango vertical de la vista: percentiles 1–99 de los valores finitos, con margen."""
+    import numpy as np
+
+    finitos = valores[np.isfinite(valores)]
+    if finitos.size == 0:
+        return -1.0, 1.0
+    bajo, alto = np.percentile(finitos, (1, 99))
+    margen = 0.1 * (alto - bajo) or max(1.0, abs(bajo))
+    return float(bajo - margen), float(alto + margen)
+
+def muestrear_adaptativo(funcion, izquierda, derecha, pixeles=800, alto_px=300,
+                         singularidades=(), tolerancia_px=0.5, max_niveles=20,
+                         max_puntos=20000):
+    """
+    Muestrea una función vectorizada de NumPy sobre [izquierda, derecha] para
+    graficarla. Parte de una malla gruesa, agrupa puntos geométricamente hacia
+    las `singularidades` conocidas y, en cada nivel, evalúa en un solo lote los
+    puntos medios de los intervalos donde la recta se aparta de la curva más
+    de `tolerancia_px` píxeles o donde la función deja de ser finita.
+
+    Devuelve (xs, ys, (y_min, y_max)): los valores no finitos quedan como NaN,
+    los saltos sin resolver (polos con cambio de signo) se cortan con un NaN y
+    (y_min, y_max) es el rango de la vista calculado sobre la malla uniforme.
+    """
+    import numpy as np
+
+    def evaluar(puntos):
+        with np.errstate(all='ignore'):
+            valores = np.broadcast_to(funcion(puntos), puntos.shape).astype(float)
+        return np.where(np.isfinite(valores), valores, np.nan)
+
+    ancho = derecha - izquierda
+    xs = np.linspace(izquierda, derecha, max(pixeles // 4, 8) + 1)
+    ys = evaluar(xs)
+    y_min, y_max = _rango_robusto(ys)
+    # Píxeles por unidad de y; los valores se recortan a una vista ampliada para
+    # que un polo no exija refinar sin fin una vez que sale de la figura.
+    escala = alto_px / (y_max - y_min)
+    recorte = (y_min - (y_max - y_min), y_max + (y_max - y_min))
+
+    singularidades = np.asarray([s for s in singularidades if izquierda <= s <= derecha], dtype=float)
+    if singularidades.size:
+        pasos = ancho * 0.5 ** np.arange(3, 3 + max_niveles)
+        cerca = (singularidades[:, None, None] + np.array([-1.0, 1.0])[None, :, None] * pasos).ravel()
+        cerca = cerca[(cerca > izquierda) & (cerca < derecha)]
+        xs = np.union1d(xs, cerca)
+        ys = evaluar(xs)
+
+    def a_pixeles(valores):
+        return np.clip(np.nan_to_num(valores, nan=0.0), *recorte) * escala
+
+    # Intervalos candidatos (índices del extremo izquierdo); al inicio, todos
+    pendientes = np.arange(xs.size - 1)
+    for _ in range(max_niveles):
+        if pendientes.size == 0 or xs.size + pendientes.size > max_puntos:
+            break
+        izq, der = xs[pendientes], xs[pendientes + 1]
+        medios = 0.5 * (izq + der)
+        y_medios = evaluar(medios)
+        y_izq, y_der = ys[pendientes], ys[pendientes + 1]
+
+        finito_izq, finito_der, finito_medio = np.isfinite(y_izq), np.isfinite(y_der), np.isfinite(y_medios)
+        desviacion = np.abs(a_pixeles(y_medios) - 0.5 * (a_pixeles(y_izq) + a_pixeles(y_der)))
+        # Curvatura visible, o un borde del dominio dentro del intervalo
+        refinar = (((desviacion > tolerancia_px) & finito_izq & finito_der & finito_medio)
+                   | (finito_izq != finito_der) | (finito_medio != finito_izq))
+
+        orden = np.argsort(np.concatenate([xs, medios]), kind='stable')
+        posicion = np.empty_like(orden)
+        posicion[orden] = np.arange(orden.size)
+        xs = np.concatenate([xs, medios])[orden]
+        ys = np.concatenate([ys, y_medios])[orden]
+        # Cada intervalo refinado deja dos mitades: [izq, medio] y [medio, der]
+        nuevos_medios = posicion[-medios.size:][refinar]
+        pendientes = np.sort(np.concatenate([nuevos_medios - 1, nuevos_medios]))
+
+    # Saltos que siguen sin resolverse: cortar la línea en lugar de unir ±∞
+    salto = np.abs(np.diff(a_pixeles(ys))) > alto_px
+    salto &= np.isfinite(ys[:-1]) & np.isfinite(ys[1:])
+    if salto.any():
+        cortes = np.flatnonzero(salto) + 1
+        xs = np.insert(xs, cortes, 0.5 * (xs[cortes - 1] + xs[cortes]))
+        ys = np.insert(ys, cortes, np.nan)
+    return xs, ys, (y_min, y_max)
+
+def reducir_a_pixeles(xs, ys, pixeles=800):
+    """
+    Reduce una curva muestreada a lo que se distingue en `pixeles` columnas:
+    por columna conserva el primer y el último punto y los de valor mínimo y
+    máximo, y el primer NaN de cada hueco para que la línea se siga cortando.
+    """
+    import numpy as np
+
+    if xs.size <= 4 * pixeles:
+        return xs, ys
+    finitos = np.isfinite(ys)
+    columnas = np.minimum(((xs - xs[0]) / (xs[-1] - xs[0]) * pixeles).astype(int), pixeles - 1)
+    inicios = np.flatnonzero(np.r_[True, columnas[1:] != columnas[:-1]])
+    por_punto = np.repeat(np.arange(inicios.size), np.diff(np.r_[inicios, xs.size]))
+    minimos = np.minimum.reduceat(np.where(finitos, ys, np.inf), inicios)[por_punto]
+    maximos = np.maximum.reduceat(np.where(finitos, ys, -np.inf), inicios)[por_punto]
+
+    conservar = finitos & ((ys == minimos) | (ys == maximos))
+    conservar[inicios] = True
+    conservar[np.r_[inicios[1:] - 1, xs.size - 1]] = True
+    conservar |= ~finitos & np.r_[True, finitos[:-1]]
+    return xs[conservar], ys[conservar]
+
+def _graficar_en_proceso(indice, func_str, ruta, timeout=None, ancho_px=800, alto_px=600,
+                         dpi=100) -> Dict:
+    """Resuelve una integral y guarda la gráfica de f y F en `ruta`."""
+    inicio = time.perf_counter()
+    try:
+        with limite_tiempo(timeout):
+            resolvedor = SustitucionTrigonometricaInteractiva(
+                interpretar_funcion(func_str), x, silencioso=True, nivel_detalle='basico')
+            estado, mensaje = estado_resultado(resolvedor.resolver_pasos())
+            if estado == 'resuelto':
+                resolvedor.graficar(ruta, ancho_px, alto_px, dpi)
+    except TimeoutError as e:
+        return resultado_lote(indice, func_str, 'tiempo_agotado', mensaje=str(e),
+                              duracion=time.perf_counter() - inicio)
+    except MemoryError:
+        return resultado_lote(indice, func_str, 'memoria_agotada', mensaje="Memoria insuficiente",
+                              duracion=time.perf_counter() - inicio)
+    except Exception as e:
+        return resultado_lote(indice, func_str, 'error', mensaje=str(e),
+                              duracion=time.perf_counter() - inicio)
+    resultado = resultado_lote(indice, func_str, estado, resolvedor.tipo_sustitucion,
+                               str(resolvedor.parametro_a), str(resolvedor.resultado_final),
+                               mensaje, duracion=time.perf_counter() - inicio)
+    resultado['archivo'] = ruta if estado == 'resuelto' else None
+    return resultado
+
+def _precargar_graficos():
+    """Importa NumPy y Agg antes de crear un pool: con fork los trabajadores los heredan."""
+    import numpy  # noqa: F401
+    import matplotlib.backends.backend_agg  # noqa: F401
+
+def renderizar_graficas_lote(funciones: Iterable, directorio, formato='png',
+                             max_procesos: Optional[int] = None,
+                             timeout: Optional[float] = None, **opciones) -> List[Dict]:
+    """
+    Resuelve y grafica muchas integrales en un pool de procesos, sin pantalla.
+    Cada gráfica se guarda como `directorio/NNNNN.formato` (N = índice de
+    entrada); devuelve el formato de resolver_lote más el campo 'archivo'.
+    `opciones` pasa ancho_px, alto_px y dpi a graficar(). Para entradas
+    grandes, resolver_jsonl(directorio_graficas=...) hace lo mismo en streaming.
+    """
+    funciones = [f if isinstance(f, str) else str(f) for f in funciones]
+    if not funciones:
+        return []
+    os.makedirs(directorio, exist_ok=True)
+    _precargar_graficos()
+    with ProcessPoolExecutor(max_workers=max_procesos) as ejecutor:
+        futuros = [ejecutor.submit(_graficar_en_proceso, indice, func_str,
+                                   os.path.join(directorio, f'{indice:05d}.{formato}'),
+                                   timeout, **opciones)
+                   for indice, func_str in enumerate(funciones)]
+        return [futuro.result() for futuro in futuros]
+
+
+# ---------- Cuadratura numérica (Gauss–Kronrod) ----------
+# Nodos y pesos de la regla de Kronrod de 15 puntos sobre [-1, 1] y de la
+# regla de Gauss de 7 puntos embebida (nodos impares de Kronrod).
+_NODOS_KRONROD = (
+    -0.991455371120812639206854697526329, -0.949107912342758524526189684047851,
+    -0.864864423359769072789712788640926, -0.741531185599394439863864773280788,
+    -0.586087235467691130294144845693013, -0.405845151377397166906606412076961,
+    -0.207784955007898467600689403773245, 0.000000000000000000000000000000000,
+    0.207784955007898467600689403773245, 0.405845151377397166906606412076961,
+    0.586087235467691130294144845693013, 0.741531185599394439863864773280788,
+    0.864864423359769072789712788640926, 0.949107912342758524526189684047851,
+    0.991455371120812639206854697526329,
+)
+_PESOS_KRONROD = (
+    0.022935322010529224963732008058970, 0.063092092629978553290700663189204,
+    0.104790010322250183839876322541518, 0.140653259715525918745189590510238,
+    0.169004726639267902826583426598550, 0.190350578064785409913256402421014,
+    0.204432940075298892414161999234649, 0.209482141084727828012999174891714,
+    0.204432940075298892414161999234649, 0.190350578064785409913256402421014,
+    0.169004726639267902826583426598550, 0.140653259715525918745189590510238,
+    0.104790010322250183839876322541518, 0.063092092629978553290700663189204,
+    0.022935322010529224963732008058970,
+)
+_PESOS_GAUSS = (
+    0.129484966168869693270611432679082, 0.279705391489276667901467771423780,
+    0.381830050505118944950369775488975, 0.417959183673469387755102040816327,
+    0.381830050505118944950369775488975, 0.279705391489276667901467771423780,
+    0.129484966168869693270611432679082,
+)
+
+@lru_cache(maxsize=None)
+def _regla_kronrod():
+    """Nodos y pesos como arreglos de NumPy (importado al primer uso)."""
+    import numpy as np
+    return np.array(_NODOS_KRONROD), np.array(_PESOS_KRONROD), np.array(_PESOS_GAUSS)
+
+def _kronrod_intervalo(f, izquierda, derecha):
+    """Integral G7-K15 sobre [izquierda, derecha] y su estimación de error."""
+    nodos, pesos_kronrod, pesos_gauss = _regla_kronrod()
+    centro = 0.5 * (izquierda + derecha)
+    radio = 0.5 * (derecha - izquierda)
+    valores = f(centro + radio * nodos)
+    kronrod = radio * float(pesos_kronrod @ valores)
+    gauss = radio * float(pesos_gauss @ valores[1::2])
+    return kronrod, abs(kronrod - gauss)
+
+def integrar_numericamente(funcion, lim_inf, lim_sup, variable=x,
+                           tolerancia=1e-10, max_subintervalos=500) -> Tuple[float, float]:
+    """
+    Integral definida por cuadratura adaptativa de Gauss–Kronrod (G7-K15).
+
+    El integrando se compila con lambdify. Para tolerar singularidades
+    integrables en los extremos, típicas de 1/√(a² - x²), se integra tras el
+    cambio x = lim_inf + (lim_sup - lim_inf)·(3t² - 2t³), cuyo jacobiano se
+    anula en t = 0 y t = 1. Devuelve (valor, estimación del error absoluto).
+    """
+    funcion = interpretar_funcion(funcion) if isinstance(funcion, str) else funcion
+    lim_inf, lim_sup = float(lim_inf), float(lim_sup)
+    if not (math.isfinite(lim_inf) and math.isfinite(lim_sup)):
+        raise ValueError("La cuadratura numérica requiere límites finitos.")
+    if lim_inf == lim_sup:
+        return 0.0, 0.0
+
+    import numpy as np
+
+    evaluar = sp.lambdify(variable, funcion, modules='numpy')
+    longitud = lim_sup - lim_inf
+
+    def integrando_t(t):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            valores = evaluar(lim_inf + longitud * t * t * (3 - 2 * t)) * (6 * longitud * t * (1 - t))
+        valores = np.broadcast_to(valores, t.shape)
+        if np.iscomplexobj(valores) or not np.all(np.isfinite(valores)):
+            raise ValueError("El integrando no es real y finito en el intervalo.")
+        return valores
+
+    # Bisección del subintervalo con mayor error hasta alcanzar la tolerancia
+    valor, error = _kronrod_intervalo(integrando_t, 0.0, 1.0)
+    pendientes = [(-error, 0.0, 1.0, valor)]
+    while error > max(tolerancia, tolerancia * abs(valor)) and len(pendientes) < max_subintervalos:
+        _, izquierda, derecha, _ = heapq.heappop(pendientes)
+        medio = 0.5 * (izquierda + derecha)
+        for extremo_i, extremo_d in ((izquierda, medio), (medio, derecha)):
+            parcial, error_parcial = _kronrod_intervalo(integrando_t, extremo_i, extremo_d)
+            heapq.heappush(pendientes, (-error_parcial, extremo_i, extremo_d, parcial))
+        valor = math.fsum(p[3] for p in pendientes)
+        error = math.fsum(-p[0] for p in pendientes)
+
+    return float(valor), float(error)
+
+def _integral_definida_simbolica(func_str, lim_inf, lim_sup, conexion):
+    """Proceso hijo: resuelve por sustitución y evalúa F(lim_sup) - F(lim_inf)."""
+    try:
+        resolvedor = SustitucionTrigonometricaInteractiva(interpretar_funcion(func_str), x,
+                                                          silencioso=True)
+        antiderivada = resolvedor.resolver_pasos()
+        if theta in antiderivada.free_symbols:
+            raise ValueError("La desustitución fue incompleta.")
+        superior, inferior = sp.nsimplify(lim_sup), sp.nsimplify(lim_inf)
+        exacto = antiderivada.subs(x, superior) - antiderivada.subs(x, inferior)
+        conexion.send(('ok', str(exacto), float(sp.N(exacto))))
+    except Exception as e:
+        conexion.send(('error', str(e), None))
+    finally:
+        conexion.close()
+
+def integral_definida_con_respaldo(funcion, lim_inf, lim_sup, timeout=5.0) -> Dict:
+    """
+    Integral definida que compite entre el camino simbólico y el numérico.
+
+    El camino simbólico corre en un proceso aparte con límite `timeout`;
+    mientras tanto se calcula la cuadratura de Gauss–Kronrod. Si el camino
+    simbólico no termina a tiempo, falla (p. ej. sin patrón detectado) o
+    discrepa de la cuadratura, se devuelve el valor numérico.
+    """
+    func_str = funcion if isinstance(funcion, str) else str(funcion)
+    receptor, emisor = multiprocessing.Pipe(duplex=False)
+    proceso = multiprocessing.Process(target=_integral_definida_simbolica,
+                                      args=(func_str, lim_inf, lim_sup, emisor), daemon=True)
+    inicio = time.perf_counter()
+    proceso.start()
+    emisor.close()
+
+    try:
+        valor_numerico, error_numerico = integrar_numericamente(func_str, lim_inf, lim_sup)
+    except ValueError:
+        valor_numerico, error_numerico = None, None
+
+    respuesta = None
+    restante = max(0.0, timeout - (time.perf_counter() - inicio))
+    if receptor.poll(restante):
+        try:
+            respuesta = receptor.recv()
+        except EOFError:
+            pass
+    if proceso.is_alive():
+        proceso.terminate()
+    proceso.join()
+    receptor.close()
+
+    if respuesta and respuesta[0] == 'ok':
+        estado, exacto, valor = respuesta
+        tolerancia = 1e-6 * max(1.0, abs(valor)) + (error_numerico or 0.0)
+        if valor_numerico is None or abs(valor - valor_numerico) <= tolerancia:
+            return {'metodo': 'simbolico', 'valor': valor, 'error': 0.0, 'exacto': exacto,
+                    'duracion': time.perf_counter() - inicio}
+
+    if valor_numerico is None:
+        raise ValueError("No fue posible evaluar la integral ni simbólica ni numéricamente.")
+    return {'metodo': 'numerico', 'valor': valor_numerico, 'error': error_numerico,
+            'exacto': None, 'duracion': time.perf_counter() - inicio}
+
+# ---------- Resolución por lotes ----------
+# Nombres que puede usar un integrando; cualquier otro identificador se vuelve símbolo
+FUNCIONES_PERMITIDAS = {
+    nombre: getattr(sp, nombre) for nombre in (
+        'sqrt', 'root', 'exp', 'log', 'Abs', 'sin', 'cos', 'tan', 'sec', 'csc', 'cot',
+        'asin', 'acos', 'atan', 'asec', 'acsc', 'acot', 'sinh', 'cosh', 'tanh',
+        'asinh', 'acosh', 'atanh', 'pi', 'E', 'I', 'oo', 'Rational')
+}
+FUNCIONES_PERMITIDAS['ln'] = sp.log
+
+def _validar_texto_funcion(func_str):
+    """
+    Rechaza texto que no sea una expresión aritmética: cadenas, atributos,
+    nombres con doble guion bajo y palabras clave de Python (lambda, for, ...).
+    """
+    import keyword
+    import tokenize
+
+    try:
+        fichas = list(tokenize.generate_tokens(io.StringIO(func_str).readline))
+    except (tokenize.TokenError, SyntaxError) as e:
+        raise ValueError(f"Expresión mal formada: {func_str!r}") from e
+    for ficha in fichas:
+        # Una cadena llegaría a sympify como argumento de una función indefinida
+        if ficha.type == tokenize.STRING or tokenize.tok_name[ficha.type].startswith('FSTRING'):
+            raise ValueError("La función no puede contener cadenas de texto")
+        if ficha.type == tokenize.OP and ficha.string in ('.', ':=', ';', '@'):
+            raise ValueError(f"Operador no permitido en la función: {ficha.string!r}")
+        if ficha.type == tokenize.NAME and ('__' in ficha.string or keyword.iskeyword(ficha.string)):
+            raise ValueError(f"Nombre no permitido en la función: {ficha.string!r}")
+
+def interpretar_funcion(func_str):
+    """
+    Convierte texto a expresión SymPy usando el símbolo global x, para que
+    las sustituciones del resolvedor actúen sobre la misma variable.
+
+    El texto puede venir de la red o de un archivo, así que no pasa por
+    sympify (que evalúa Python arbitrario): se valida por fichas y se
+    interpreta con parse_expr en un espacio de nombres restringido a
+    FUNCIONES_PERMITIDAS y sin builtins.
+    """
+    from sympy.parsing.sympy_parser import parse_expr, standard_transformations, convert_xor
+
+    func_str = str(func_str)
+    _validar_texto_funcion(func_str)
+    # Integer, Float y Symbol los emiten las transformaciones estándar
+    globales = {'__builtins__': {}, 'Integer': sp.Integer, 'Float': sp.Float,
+                'Symbol': sp.Symbol, 'Function': sp.Function, **FUNCIONES_PERMITIDAS}
+    try:
+        expresion = parse_expr(func_str, local_dict={'x': x}, global_dict=globales,
+                               transformations=standard_transformations + (convert_xor,))
+    except (SyntaxError, TypeError, NameError) as e:
+        raise ValueError(f"Expresión no válida: {func_str!r}") from e
+    if not isinstance(expresion, sp.Expr):
+        raise ValueError(f"La función debe ser una expresión de x: {func_str!r}")
+    return expresion
+
+def resultado_lote(indice, funcion, estado, tipo=None, a=None, resultado=None,
+                   mensaje=None, duracion=None) -> Dict:
+    """
+    Diccionario de resultado estructurado de una integral: el esquema común
+    de las filas JSONL del lote, la cola compartida y resolver_en_carrera.
+    """
+    return {
+        'indice': indice,
+        'funcion': funcion,
+        'estado': estado,
+        'tipo': tipo,
+        'a': a,
+        'resultado': resultado,
+        'mensaje': mensaje,
+        'duracion': duracion,
+    }
+
+def estado_resultado(resultado) -> Tuple[str, Optional[str]]:
+    """
+    Estado y mensaje de una antiderivada para los resultados estructurados
+    (lote, cola, servicio HTTP): ('resuelto', None) si es cerrada y
+    ('sin_resolver', motivo) si quedó una integral sin evaluar o θ sin
+    desustituir.
+    """
+    if resultado.has(sp.Integral):
+        return 'sin_resolver', "El resultado contiene una integral sin evaluar"
+    if theta in resultado.free_symbols:
+        return 'sin_resolver', "La antiderivada aún depende de θ"
+    return 'resuelto', None
+
+@contextlib.contextmanager
+def limite_tiempo(segundos):
+    """
+    Contexto que lanza TimeoutError si el bloque tarda más de `segundos`.
+    Usa SIGALRM, así que sólo funciona en Unix y en el hilo principal; con
+    `segundos` None o 0 no limita nada. Lo usan los trabajadores del lote,
+    de la cola y del servicio HTTP.
+    """
+    if not segundos:
+        yield
+        return
+
+    def _expirar(signum, frame):
+        raise TimeoutError(f"Superó el límite de {segundos} s")
+
+    anterior = signal.signal(signal.SIGALRM, _expirar)
+    signal.setitimer(signal.ITIMER_REAL, segundos)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, anterior)
+
+def inicializar_trabajador(ruta_cache=None, memoria_mb=None):
+    """
+    Inicializador de un proceso trabajador (lote o cola): configura la caché
+    de integrales (en disco si se da `ruta_cache`) y el tope de memoria.
+    """
+    configurar_cache(ruta_disco=ruta_cache)
+    _limitar_memoria(memoria_mb)
+
+def resolver_en_proceso(indice, func_str, timeout=None) -> Dict:
+    """
+    Resuelve una integral dentro de un proceso trabajador y devuelve su
+    resultado_lote. Nunca lanza: los fallos quedan en 'estado' y 'mensaje'.
+    """
+    inicio = time.perf_counter()
+    resolvedor = None
+    try:
+        with limite_tiempo(timeout):
+            funcion = interpretar_funcion(func_str)
+            resolvedor = SustitucionTrigonometricaInteractiva(funcion, x, silencioso=True)
+            resultado = resolvedor.resolver_pasos()
+        estado, mensaje = estado_resultado(resultado)
+    except TimeoutError as e:
+        resultado, estado, mensaje = None, 'tiempo_agotado', str(e)
+    except MemoryError:
+        resultado, estado, mensaje = None, 'memoria_agotada', "Memoria insuficiente"
+    except Exception as e:
+        resultado, estado, mensaje = None, 'error', str(e)
+
+    return resultado_lote(
+        indice, func_str, estado,
+        tipo=resolvedor.tipo_sustitucion if resolvedor else None,
+        a=str(resolvedor.parametro_a) if resolvedor and resolvedor.parametro_a is not None else None,
+        resultado=str(resultado) if resultado is not None else None,
+        mensaje=mensaje,
+        duracion=time.perf_counter() - inicio,
+    )
+
+# ---------- Límites duros de tiempo y memoria ----------
+def _limitar_memoria(memoria_mb):
+    """
+    Tope de espacio de direcciones (RLIMIT_AS) para el proceso actual, de
+    modo que una expansión descontrolada termine en MemoryError. Sólo Unix.
+    """
+    if not memoria_mb:
+        return
+    try:
+        import resource
+    except ImportError:
+        return
+    limite = int(memoria_mb * 1024 * 1024)
+    resource.setrlimit(resource.RLIMIT_AS, (limite, limite))
+
+def _memoria_residente_mb(pid) -> Optional[float]:
+    """RSS de un proceso en MB leído de /proc (None si no está disponible)."""
+    try:
+        with open(f'/proc/{pid}/statm') as archivo:
+            paginas = int(archivo.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return paginas * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+def _ejecutar_limitado(conexion, objetivo, args, memoria_mb):
+    """Proceso hijo: aplica el tope de memoria y devuelve el resultado por el pipe."""
+    # El tope virtual es un respaldo holgado; el límite de RSS lo vigila el padre
+    _limitar_memoria(max(2 * memoria_mb, memoria_mb + 1024) if memoria_mb else None)
+    try:
+        conexion.send(('resuelto', objetivo(*args)))
+    except MemoryError:
+        conexion.send(('memoria_agotada', f"Superó el límite de {memoria_mb} MB"))
+    except Exception as e:
+        conexion.send(('error', str(e)))
+    finally:
+        conexion.close()
+
+def ejecutar_con_limites(objetivo, args=(), timeout=None, memoria_mb=None) -> Tuple[str, object]:
+    """
+    Ejecuta objetivo(*args) en un subproceso que se mata si supera `timeout`
+    segundos de reloj o `memoria_mb` MB de memoria residente.
+
+    Devuelve (estado, valor) con estado 'resuelto', 'tiempo_agotado',
+    'memoria_agotada' o 'error'.
+    """
+    receptor, emisor = multiprocessing.Pipe(duplex=False)
+    proceso = multiprocessing.Process(target=_ejecutar_limitado,
+                                      args=(emisor, objetivo, args, memoria_mb), daemon=True)
+    proceso.start()
+    emisor.close()
+    limite = time.monotonic() + timeout if timeout else math.inf
+
+    respuesta = None
+    try:
+        while respuesta is None:
+            if receptor.poll(0.05):
+                try:
+                    respuesta = receptor.recv()
+                except EOFError:
+                    break
+            elif not proceso.is_alive():
+                break
+            elif time.monotonic() > limite:
+                respuesta = ('tiempo_agotado', f"Superó el límite de {timeout} s")
+            elif memoria_mb and (_memoria_residente_mb(proceso.pid) or 0) > memoria_mb:
+                respuesta = ('memoria_agotada', f"Superó el límite de {memoria_mb} MB")
+    finally:
+        if proceso.is_alive():
+            proceso.kill()
+        proceso.join()
+        receptor.close()
+
+    if respuesta is None:
+        # Murió sin responder: SIGKILL suele ser el OOM killer del sistema
+        if proceso.exitcode == -signal.SIGKILL:
+            return 'memoria_agotada', "Proceso terminado por falta de memoria"
+        return 'error', f"El proceso terminó inesperadamente (código {proceso.exitcode})"
+    return respuesta
+
+def resolver_con_limites(func_str, timeout=30.0, memoria_mb=1024) -> Dict:
+    """
+    Resuelve una integral en un subproceso desechable con límites duros de
+    tiempo y memoria. El resultado tiene el mismo formato que resolver_lote.
+    """
+    inicio = time.perf_counter()
+    estado, valor = ejecutar_con_limites(resolver_en_proceso, (0, func_str), timeout, memoria_mb)
+    if estado == 'resuelto':
+        return valor
+    return resultado_lote(0, func_str, estado, mensaje=valor,
+                          duracion=time.perf_counter() - inicio)
+
+
+# ---------- Carrera de estrategias ----------
+ESTRATEGIAS = ('trigonometrica', 'hiperbolica', 'integrate', 'manualintegrate')
+
+# Victorias acumuladas por estrategia en este proceso, para ajustar los valores por defecto
+victorias_estrategias: Dict[str, int] = dict.fromkeys(ESTRATEGIAS, 0)
+
+def _resolver_estrategia(estrategia, func_str) -> Tuple[str, float, Optional[str], Optional[str]]:
+    """
+    Proceso de la carrera: resuelve con una estrategia y verifica el
+    resultado numéricamente. Devuelve (antiderivada, error máximo, tipo de
+    sustitución, a), estos dos últimos None si no se detectó patrón.
+    """
+    resolvedor = SustitucionTrigonometricaInteractiva(interpretar_funcion(func_str), x,
+                                                      silencioso=True)
+    if estrategia == 'trigonometrica':
+        resultado = resolvedor.resolver_pasos()
+    else:
+        resolvedor.detectar_tipo_sustitucion()
+        if estrategia == 'hiperbolica':
+            resultado = resolvedor.resolver_hiperbolica()
+        elif estrategia == 'integrate':
+            resultado = integrate(resolvedor.funcion, x)
+        else:
+            from sympy.integrals.manualintegrate import manualintegrate
+            resultado = manualintegrate(resolvedor.funcion, x)
+        resolvedor.resultado_final = resultado
+
+    if resultado.has(sp.Integral) or theta in resultado.free_symbols:
+        raise ValueError("La estrategia no llegó a una antiderivada cerrada.")
+    veredicto = resolvedor.verificar()
+    if not veredicto['valido']:
+        raise ValueError(f"Verificación fallida (error máximo {veredicto['error_maximo']:.2e})")
+    a = str(resolvedor.parametro_a) if resolvedor.parametro_a is not None else None
+    return str(resultado), veredicto['error_maximo'], resolvedor.tipo_sustitucion, a
+
+def resolver_en_carrera(func_str, estrategias=ESTRATEGIAS, timeout=30.0,
+                        memoria_mb=None) -> Dict:
+    """
+    Lanza cada estrategia en su propio proceso y se queda con el primer
+    resultado verificado; los procesos restantes se matan en cuanto hay
+    ganador. Devuelve el formato de resolver_lote más 'estrategia' (la
+    ganadora o None) y 'fallos' (mensaje por estrategia descartada).
+    """
+    from multiprocessing.connection import wait
+    # Los hijos heredan NumPy ya importado en lugar de importarlo al verificar
+    import numpy  # noqa: F401
+
+    inicio = time.perf_counter()
+    procesos = {}
+    for estrategia in estrategias:
+        receptor, emisor = multiprocessing.Pipe(duplex=False)
+        proceso = multiprocessing.Process(
+            target=_ejecutar_limitado,
+            args=(emisor, _resolver_estrategia, (estrategia, func_str), memoria_mb), daemon=True)
+        proceso.start()
+        emisor.close()
+        procesos[receptor] = (estrategia, proceso)
+
+    limite = time.monotonic() + timeout if timeout else math.inf
+    ganadora, resultado, fallos = None, None, {}
+    pendientes = list(procesos)
+    try:
+        while pendientes and ganadora is None:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            for receptor in wait(pendientes, timeout=min(restante, 0.5)):
+                pendientes.remove(receptor)
+                estrategia, _ = procesos[receptor]
+                try:
+                    estado, valor = receptor.recv()
+                except EOFError:
+                    estado, valor = 'error', "El proceso terminó inesperadamente"
+                if estado == 'resuelto' and ganadora is None:
+                    ganadora, resultado = estrategia, valor
+                elif estado != 'resuelto':
+                    fallos[estrategia] = valor
+            if memoria_mb:
+                for receptor in list(pendientes):
+                    estrategia, proceso = procesos[receptor]
+                    if (_memoria_residente_mb(proceso.pid) or 0) > memoria_mb:
+                        pendientes.remove(receptor)
+                        fallos[estrategia] = f"Superó el límite de {memoria_mb} MB"
+                        proceso.kill()
+    finally:
+        for receptor, (estrategia, proceso) in procesos.items():
+            if proceso.is_alive():
+                proceso.kill()
+            proceso.join()
+            receptor.close()
+
+    duracion = time.perf_counter() - inicio
+    if ganadora is None:
+        estado = 'tiempo_agotado' if pendientes else 'error'
+        for receptor in pendientes:
+            fallos[procesos[receptor][0]] = f"Superó el límite de {timeout} s"
+        respuesta = resultado_lote(0, func_str, estado, duracion=duracion,
+                                   mensaje="Ninguna estrategia verificó un resultado")
+    else:
+        victorias_estrategias[ganadora] += 1
+        antiderivada, _, tipo, a = resultado
+        respuesta = resultado_lote(0, func_str, 'resuelto', tipo=tipo, a=a,
+                                   resultado=antiderivada, duracion=duracion)
+    respuesta.update(estrategia=ganadora, fallos=fallos)
+    return respuesta
+
+
+# ---------- Modo por lotes JSONL (línea de comandos) ----------
+class PuntoControl:
+    """
+    Registro append-only de las líneas ya resueltas, para reanudar una
+    ejecución interrumpida. En memoria sólo se guarda el prefijo contiguo
+    completado y las líneas sueltas por encima de él (acotadas por la
+    ventana de trabajos en vuelo).
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.contiguo = -1
+        self.sueltos = set()
+        if os.path.exists(ruta):
+            with open(ruta, encoding='utf-8') as archivo:
+                for linea in archivo:
+                    if linea.strip():
+                        self._marcar(int(linea))
+        self._archivo = open(ruta, 'a', encoding='utf-8')
+
+    def _marcar(self, indice):
+        if indice > self.contiguo:
+            self.sueltos.add(indice)
+        while self.contiguo + 1 in self.sueltos:
+            self.contiguo += 1
+            self.sueltos.remove(self.contiguo)
+
+    def contiene(self, indice):
+        return indice <= self.contiguo or indice in self.sueltos
+
+    def registrar(self, indice):
+        self._marcar(indice)
+        self._archivo.write(f"{indice}\n")
+        self._archivo.flush()
+
+    def cerrar(self):
+        self._archivo.close()
+
+def leer_integrando(linea):
+    """
+    Integrando de una línea JSONL: un texto JSON o un objeto con el campo
+    "funcion". Lanza ValueError (o KeyError) si la línea no tiene ese formato.
+    """
+    dato = json.loads(linea)
+    if isinstance(dato, dict):
+        return str(dato['funcion'])
+    if isinstance(dato, str):
+        return dato
+    raise ValueError('Se esperaba un texto o un objeto con el campo "funcion"')
+
+def resolver_jsonl(entrada, salida, max_procesos: Optional[int] = None,
+                   timeout: Optional[float] = None, orden='entrada',
+                   ruta_checkpoint: Optional[str] = None, en_vuelo: Optional[int] = None,
+                   memoria_mb: Optional[float] = None,
+                   directorio_graficas: Optional[str] = None, formato='png'):
+    """
+    Lee integrandos JSONL de `entrada` y escribe un resultado JSON por línea
+    en `salida` apenas termina cada uno, en orden de entrada o de
+    terminación. Sólo se mantienen `en_vuelo` trabajos a la vez, así la
+    memoria no depende del tamaño de la entrada.
+
+    Con `directorio_graficas` cada integrando resuelto se grafica además en
+    `directorio_graficas/NNNNN.formato`, con N el número de línea de entrada;
+    el resultado lleva entonces el campo 'archivo'.
+    """
+    if orden not in ('entrada', 'terminacion'):
+        raise ValueError("orden debe ser 'entrada' o 'terminacion'")
+    max_procesos = max_procesos or os.cpu_count() or 1
+    en_vuelo = en_vuelo or 4 * max_procesos
+    if directorio_graficas is not None:
+        os.makedirs(directorio_graficas, exist_ok=True)
+        _precargar_graficos()
+    punto_control = PuntoControl(ruta_checkpoint) if ruta_checkpoint else None
+    pendientes = deque()
+
+    def emitir(futuro):
+        resultado = futuro.result()
+        salida.write(json.dumps(resultado, ensure_ascii=False) + '\n')
+        salida.flush()
+        # Se registra después de escribir: ante una caída se repite, no se pierde
+        if punto_control is not None:
+            punto_control.registrar(resultado['indice'])
+
+    def drenar(hasta):
+        while len(pendientes) > hasta:
+            if orden == 'entrada':
+                emitir(pendientes.popleft())
+                continue
+            listos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                pendientes.remove(futuro)
+                emitir(futuro)
+
+    try:
+        with ProcessPoolExecutor(max_workers=max_procesos, initializer=inicializar_trabajador,
+                                 initargs=(None, memoria_mb)) as ejecutor:
+            for indice, linea in enumerate(entrada):
+                if not linea.strip() or (punto_control and punto_control.contiene(indice)):
+                    continue
+                try:
+                    func_str = leer_integrando(linea)
+                    if directorio_graficas is None:
+                        futuro = ejecutor.submit(resolver_en_proceso, indice, func_str, timeout)
+                    else:
+                        ruta = os.path.join(directorio_graficas, f'{indice:05d}.{formato}')
+                        futuro = ejecutor.submit(_graficar_en_proceso, indice, func_str, ruta,
+                                                 timeout)
+                except (ValueError, KeyError) as e:
+                    futuro = Future()
+                    futuro.set_result(resultado_lote(indice, linea.strip(), 'error',
+                                                     mensaje=f"Línea inválida: {e}"))
+                pendientes.append(futuro)
+                drenar(en_vuelo - 1)
+            drenar(0)
+    finally:
+        if punto_control is not None:
+            punto_control.cerrar()
+
+def _argumentos_linea_comandos():
+    parser = argparse.ArgumentParser(
+        description="Integrales por sustitución trigonométrica. Sin argumentos abre el menú.")
+    parser.add_argument('--lote', metavar='RUTA',
+                        help="archivo JSONL de integrandos ('-' para stdin); resultados a stdout")
+    parser.add_argument('--orden', choices=('entrada', 'terminacion'), default='entrada',
+                        help='orden de los resultados (por defecto, el de entrada)')
+    parser.add_argument('--checkpoint', metavar='RUTA',
+                        help='registro de líneas resueltas para reanudar tras una caída')
+    parser.add_argument('--procesos', type=int, help='procesos trabajadores')
+    parser.add_argument('--timeout', type=float, help='segundos máximos por integral')
+    parser.add_argument('--memoria-mb', type=float, help='memoria máxima por trabajador (MB)')
+    parser.add_argument('--graficas', metavar='DIRECTORIO',
+                        help='con --lote, guarda la gráfica de f y F de cada integrando')
+    parser.add_argument('--formato', choices=('png', 'svg', 'pdf'),
+                        help='formato de las gráficas (por defecto, png)')
+    args = parser.parse_args()
+    if args.graficas and not args.lote:
+        parser.error('--graficas requiere --lote')
+    if args.formato and not args.graficas:
+        parser.error('--formato sólo tiene efecto con --graficas')
+    return args
+
 
 # ---------- Menú mejorado ----------
+# Límites para la función personalizada (opción 5)
+LIMITE_TIEMPO_PERSONALIZADA = 60.0
+LIMITE_MEMORIA_PERSONALIZADA_MB = 2048
+
+FUNCIONES_PREDEFINIDAS = {
+    1: "1/(x**2 * sqrt(x**2 - 4))",  # Caso sugerido en el PDF
+    2: "1/sqrt(9 - x**2)",
+    3: "x**2/sqrt(16 + x**2)",
+    4: "1/(x * sqrt(x**2 - 25))",
+}
+
 def menu_consola():
     """
     Menú principal para selección de funciones a integrar.
     Permite al usuario elegir entre funciones predefinidas o ingresar una personalizada.
     """
-    opciones = {
-        1: "1/(x**2 * sqrt(x**2 - 4))",  # Caso sugerido en el PDF
-        2: "1/sqrt(9 - x**2)",
-        3: "x**2/sqrt(16 + x**2)",
-        4: "1/(x * sqrt(x**2 - 25))",
-        5: "personalizada"
-    }
+    opciones = {**FUNCIONES_PREDEFINIDAS, 5: "personalizada"}
 
     mostrar_titulo_principal("📋 MENÚ DE SELECCIÓN DE FUNCIONES")
     
@@ -581,12 +2867,6 @@ def menu_consola():
     print()
     print("    " + "─" * 70)
     
-    # Solicitar nivel de detalle
-    print("\n    Nivel de detalle:")
-    print("        [1] Básico")
-    print("        [2] Detallado (por defecto)")
-    print("        [3] Completo con gráficos")
-    
     try:
         entrada = input("\n    Ingrese opción de función [1-5] (Enter para 1): ").strip()
         opcion = int(entrada) if entrada != "" else 1
@@ -597,6 +2877,23 @@ def menu_consola():
         print("\n    ⚠ Entrada inválida. Usando opción 1 por defecto.\n")
         opcion = 1
 
+    # Solicitar nivel de detalle
+    print("\n    Nivel de detalle:")
+    print("        [1] Básico (sólo el resultado)")
+    print("        [2] Detallado (por defecto)")
+    print("        [3] Completo con gráficos")
+
+    try:
+        entrada = input("\n    Ingrese nivel de detalle [1-3] (Enter para 2): ").strip()
+        nivel = int(entrada) if entrada != "" else 2
+        if not 1 <= nivel <= 3:
+            print("\n    ⚠ Nivel inválido. Usando nivel 2 por defecto.\n")
+            nivel = 2
+    except Exception:
+        print("\n    ⚠ Entrada inválida. Usando nivel 2 por defecto.\n")
+        nivel = 2
+    nivel_detalle = NIVELES_DETALLE[nivel - 1]
+
     # Manejo de función personalizada
     if opcion == 5:
         print("\n    Ingrese la función a integrar (use 'x' como variable)")
@@ -613,16 +2910,69 @@ def menu_consola():
         func_str = opciones[opcion]
         print(f"\n    ✓ Función seleccionada: {func_str}\n")
     
+    if opcion == 5:
+        # Una función arbitraria puede hacer que integrate()/simplify() no
+        # terminen: se resuelve en un subproceso con límites duros. Las
+        # ventanas de matplotlib se abren después, aquí, para que el tiempo
+        # mirándolas no cuente contra el límite.
+        estado, mensaje = ejecutar_con_limites(_resolver_interactivo,
+                                               (func_str, nivel_detalle, False),
+                                               LIMITE_TIEMPO_PERSONALIZADA,
+                                               LIMITE_MEMORIA_PERSONALIZADA_MB)
+        if estado == 'resuelto' and mensaje is not None and nivel_detalle == 'completo':
+            _mostrar_graficos(*mensaje)
+        elif estado == 'tiempo_agotado':
+            print(f"\n    ⏱ TIEMPO AGOTADO: {mensaje}. La integral se canceló.\n")
+        elif estado == 'memoria_agotada':
+            print(f"\n    💾 MEMORIA AGOTADA: {mensaje}. La integral se canceló.\n")
+        elif estado == 'error':
+            print(f"\n    ❌ Error al procesar la función: {mensaje}")
+            print("    Verifique que la sintaxis sea correcta.\n")
+        return
+
+    _resolver_interactivo(func_str, nivel_detalle)
+
+def _resolver_interactivo(func_str, nivel_detalle='detallado', graficos=True):
+    """
+    Resuelve mostrando en consola los pasos que pide el nivel de detalle.
+    Devuelve (funcion, resultado) para que el llamador muestre las figuras
+    con _mostrar_graficos() si se pidió graficos=False; si falla, None.
+    """
     try:
-        funcion = sp.sympify(func_str)
-        resolvedor = SustitucionTrigonometricaInteractiva(funcion, x)
-        resolvedor.resolver()
+        funcion = interpretar_funcion(func_str)
+        resolvedor = SustitucionTrigonometricaInteractiva(funcion, x, nivel_detalle=nivel_detalle,
+                                                          graficos=graficos)
+        resultado = resolvedor.resolver()
     except Exception as e:
         print(f"\n    ❌ Error al procesar la función: {str(e)}")
         print("    Verifique que la sintaxis sea correcta.\n")
+        return None
+    return None if resultado is None else (funcion, resultado)
+
+def _mostrar_graficos(funcion, resultado):
+    """Triángulo y gráficas de f y F de una integral ya resuelta (sin volver a integrar)."""
+    resolvedor = SustitucionTrigonometricaInteractiva(funcion, x, silencioso=True)
+    if not resolvedor.detectar_tipo_sustitucion():
+        return
+    resolvedor.resultado_final = resultado
+    try:
+        TrianguloRectangulo(resolvedor.tipo_sustitucion, resolvedor.parametro_a).dibujar_triangulo()
+        mostrar_titulo_seccion("Gráficas de f(x) y F(x)", "📈")
+        resolvedor.graficar()
+    except Exception:
+        print("    ⚠ Advertencia: No se pudieron mostrar las figuras.")
 
 
 if __name__ == "__main__":
+    args = _argumentos_linea_comandos()
+    if args.lote:
+        entrada = sys.stdin if args.lote == '-' else open(args.lote, encoding='utf-8')
+        with entrada:
+            resolver_jsonl(entrada, sys.stdout, args.procesos, args.timeout, args.orden,
+                           args.checkpoint, memoria_mb=args.memoria_mb,
+                           directorio_graficas=args.graficas, formato=args.formato or 'png')
+        sys.exit(0)
+
     # Mostrar información del proyecto
     print(__doc__)
     print("\n" + "═" * 80)
@@ -0,0 +1,243 @@
+"""
+Servicio HTTP/JSON local para resolver integrales por sustitución trigonométrica.
+
+Uso:
+    python servicio.py [--host 127.0.0.1] [--puerto 8080] [--procesos N]
+
+Rutas:
+    POST /resolver   {"funcion": "1/sqrt(9 - x**2)", "timeout": 10}
+                     (Content-Type: application/json)
+    GET  /salud      estado del servicio y contadores
+
+Cada integral se resuelve en un pool de procesos precalentado (SymPy se
+importa una sola vez por trabajador). Las peticiones que exceden la cola
+acotada se rechazan de inmediato con 503 en lugar de acumularse.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from index import (x, interpretar_funcion, expr_a_latex_limpio, Instrumentacion,
+                   SustitucionTrigonometricaInteractiva, FUNCIONES_PREDEFINIDAS, limite_tiempo,
+                   estado_resultado)
+
+
+ESTADOS_HTTP = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    413: 'Payload Too Large',
+    415: 'Unsupported Media Type',
+    422: 'Unprocessable Entity',
+    503: 'Service Unavailable',
+    504: 'Gateway Timeout',
+}
+
+MAX_CUERPO = 64 * 1024
+
+
+# ---------- Trabajadores ----------
+def _precalentar():
+    """Inicializador del pool: importa SymPy y llena sus cachés internas."""
+    SustitucionTrigonometricaInteractiva(interpretar_funcion(FUNCIONES_PREDEFINIDAS[2]), x,
+                                         silencioso=True).resolver()
+
+
+def resolver_peticion(func_str, timeout=None) -> Dict:
+    """Resuelve una integral en un trabajador y devuelve el resultado estructurado."""
+    inicio = time.perf_counter()
+    instrumentacion = Instrumentacion(medir_tamano=False)
+    resolvedor = None
+    respuesta = {'funcion': func_str, 'estado': 'resuelto', 'tipo': None, 'a': None,
+                 'resultado': None, 'latex': None, 'mensaje': None}
+    try:
+        with limite_tiempo(timeout):
+            resolvedor = SustitucionTrigonometricaInteractiva(
+                interpretar_funcion(func_str), x, silencioso=True, instrumentacion=instrumentacion)
+            resultado = resolvedor.resolver_pasos()
+        respuesta['resultado'] = str(resultado)
+        respuesta['latex'] = expr_a_latex_limpio(resultado)
+        respuesta['estado'], respuesta['mensaje'] = estado_resultado(resultado)
+    except TimeoutError as e:
+        respuesta.update(estado='tiempo_agotado', mensaje=str(e))
+    except Exception as e:
+        respuesta.update(estado='error', mensaje=str(e))
+
+    if resolvedor is not None and resolvedor.tipo_sustitucion:
+        respuesta['tipo'] = resolvedor.tipo_sustitucion
+        respuesta['a'] = str(resolvedor.parametro_a)
+    respuesta['tiempos'] = {r['paso']: r['duracion'] for r in instrumentacion.registros}
+    respuesta['tiempos']['total'] = time.perf_counter() - inicio
+    return respuesta
+
+
+# ---------- Servidor ----------
+class ServicioIntegrales:
+    """
+    Servidor HTTP/1.1 mínimo sobre asyncio. `max_cola` acota las peticiones
+    en curso más las que esperan trabajador; por encima se responde 503.
+    """
+
+    def __init__(self, host='127.0.0.1', puerto=8080, procesos=None, max_cola=64,
+                 timeout_defecto=10.0, timeout_maximo=60.0):
+        self.host = host
+        self.puerto = puerto
+        self.procesos = procesos
+        self.max_cola = max_cola
+        self.timeout_defecto = timeout_defecto
+        self.timeout_maximo = timeout_maximo
+        self.en_curso = 0
+        self.contadores = {'atendidas': 0, 'rechazadas': 0, 'tiempo_agotado': 0, 'errores': 0}
+        self._ejecutor: Optional[ProcessPoolExecutor] = None
+        self._servidor = None
+
+    async def iniciar(self):
+        procesos = self.procesos or os.cpu_count() or 1
+        self._ejecutor = ProcessPoolExecutor(max_workers=procesos, initializer=_precalentar)
+        # Forzar el arranque de todos los trabajadores antes de aceptar tráfico
+        bucle = asyncio.get_running_loop()
+        await asyncio.gather(*(bucle.run_in_executor(self._ejecutor, time.sleep, 0.05)
+                               for _ in range(procesos)))
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.puerto)
+        self.puerto = self._servidor.sockets[0].getsockname()[1]
+        return self
+
+    async def detener(self):
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+        if self._ejecutor is not None:
+            self._ejecutor.shutdown(wait=False, cancel_futures=True)
+
+    async def servir(self):
+        async with self._servidor:
+            await self._servidor.serve_forever()
+
+    async def _atender(self, lector, escritor):
+        try:
+            try:
+                estado, cuerpo = await self._procesar(lector)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+            except (ValueError, asyncio.LimitOverrunError):
+                # readline() con una línea más larga que el límite del flujo
+                estado, cuerpo = 400, {'mensaje': 'Línea de petición o cabecera demasiado larga'}
+            datos = json.dumps(cuerpo, ensure_ascii=False).encode('utf-8')
+            cabeceras = [f"HTTP/1.1 {estado} {ESTADOS_HTTP[estado]}",
+                         "Content-Type: application/json; charset=utf-8",
+                         f"Content-Length: {len(datos)}",
+                         "Connection: close"]
+            if estado == 503:
+                cabeceras.append("Retry-After: 1")
+            escritor.write(('\r\n'.join(cabeceras) + '\r\n\r\n').encode('ascii') + datos)
+            await escritor.drain()
+        except ConnectionError:
+            pass
+        finally:
+            escritor.close()
+
+    async def _procesar(self, lector):
+        linea_peticion = (await lector.readline()).decode('latin-1').split()
+        cabeceras = {}
+        while True:
+            linea = (await lector.readline()).decode('latin-1').strip()
+            if not linea:
+                break
+            nombre, _, valor = linea.partition(':')
+            cabeceras[nombre.strip().lower()] = valor.strip()
+
+        if len(linea_peticion) < 2:
+            return 400, {'mensaje': 'Petición HTTP inválida'}
+        metodo, ruta = linea_peticion[0], linea_peticion[1]
+
+        if metodo == 'GET' and ruta == '/salud':
+            return 200, {'en_curso': self.en_curso, 'max_cola': self.max_cola, **self.contadores}
+        if metodo != 'POST' or ruta != '/resolver':
+            return 404, {'mensaje': f'Ruta no encontrada: {metodo} {ruta}'}
+
+        # Un formulario de otro sitio no puede enviar JSON sin una petición previa CORS
+        tipo_contenido = cabeceras.get('content-type', '').partition(';')[0].strip().lower()
+        if tipo_contenido != 'application/json':
+            return 415, {'mensaje': 'Se esperaba Content-Type: application/json'}
+        try:
+            longitud = int(cabeceras.get('content-length', 0))
+        except ValueError:
+            return 400, {'mensaje': 'Content-Length inválido'}
+        if longitud < 0:
+            return 400, {'mensaje': 'Content-Length inválido'}
+        if longitud > MAX_CUERPO:
+            return 413, {'mensaje': 'Cuerpo demasiado grande'}
+        try:
+            peticion = json.loads(await lector.readexactly(longitud))
+            func_str = str(peticion['funcion'])
+            timeout = float(peticion.get('timeout', self.timeout_defecto))
+        except (ValueError, KeyError, TypeError):
+            return 400, {'mensaje': 'Se esperaba JSON con el campo "funcion"'}
+        # Con 0, negativo o NaN el trabajador quedaría sin SIGALRM
+        if not math.isfinite(timeout) or timeout <= 0:
+            return 400, {'mensaje': 'El campo "timeout" debe ser un número positivo'}
+        timeout = min(timeout, self.timeout_maximo)
+
+        # Descarte de carga: no se encola por encima del límite
+        if self.en_curso >= self.max_cola:
+            self.contadores['rechazadas'] += 1
+            return 503, {'mensaje': 'Servicio saturado, reintente más tarde'}
+
+        self.en_curso += 1
+        inicio = time.perf_counter()
+        try:
+            # El trabajador aplica el límite con SIGALRM; wait_for cubre la espera en cola
+            tarea = self._ejecutor.submit(resolver_peticion, func_str, timeout)
+            respuesta = await asyncio.wait_for(asyncio.wrap_future(tarea), timeout + 1.0)
+        except asyncio.TimeoutError:
+            # Si aún esperaba trabajador, que no llegue a ejecutarse
+            tarea.cancel()
+            respuesta = {'funcion': func_str, 'estado': 'tiempo_agotado',
+                         'mensaje': f'Superó el plazo de {timeout} s'}
+        finally:
+            self.en_curso -= 1
+
+        respuesta.setdefault('tiempos', {})['servicio'] = time.perf_counter() - inicio
+        if respuesta['estado'] == 'resuelto':
+            self.contadores['atendidas'] += 1
+            return 200, respuesta
+        if respuesta['estado'] == 'tiempo_agotado':
+            self.contadores['tiempo_agotado'] += 1
+            return 504, respuesta
+        self.contadores['errores'] += 1
+        return 422, respuesta
+
+
+async def _ejecutar(args):
+    servicio = await ServicioIntegrales(args.host, args.puerto, args.procesos, args.max_cola,
+                                        args.timeout).iniciar()
+    print(f"    Servicio escuchando en http://{servicio.host}:{servicio.puerto}")
+    try:
+        await servicio.servir()
+    finally:
+        await servicio.detener()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8080)
+    parser.add_argument('--procesos', type=int, help='trabajadores (por defecto, núcleos)')
+    parser.add_argument('--max-cola', type=int, default=64,
+                        help='peticiones simultáneas antes de responder 503')
+    parser.add_argument('--timeout', type=float, default=10.0, help='plazo por defecto (s)')
+    try:
+        asyncio.run(_ejecutar(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import pytest
+
+from cola import ColaTrabajo
+
+RESUELTO = {'estado': 'resuelto', 'resultado': 'asin(x/3)'}
+
+
+@pytest.fixture
+def ruta(tmp_path):
+    return str(tmp_path / 'cola.db')
+
+
+def _cola(ruta, **opciones):
+    cola = ColaTrabajo(ruta, **opciones)
+    cola.encolar(["1/sqrt(9 - x**2)", "x**2/sqrt(16 + x**2)"])
+    return cola
+
+
+def test_encolar_omite_duplicados(ruta):
+    cola = _cola(ruta)
+    assert cola.encolar(["1/sqrt(9 - x**2)", "1/(x * sqrt(x**2 - 25))"]) == 1
+    assert cola.progreso()['total'] == 3
+    cola.cerrar()
+
+
+def test_lease_vigente_no_se_reclama_dos_veces(ruta):
+    cola = _cola(ruta)
+    assert len(cola.reclamar('A', 1)) == 1
+    assert len(cola.reclamar('B', 8)) == 1
+    assert cola.reclamar('C', 8) == []
+    assert cola.hay_trabajo()
+    cola.cerrar()
+
+
+def test_lease_vencido_pasa_a_otro_trabajador(ruta):
+    # Un lease negativo vence en el acto, como si A hubiera muerto
+    cola = _cola(ruta, duracion_lease=-1.0)
+    (id_, _), _ = cola.reclamar('A', 8)
+    assert [i for i, _ in cola.reclamar('B', 1)] == [id_]
+    # A ya no posee la tarea: su resultado se descarta
+    assert not cola.completar('A', id_, RESUELTO)
+    assert cola.completar('B', id_, RESUELTO)
+    cola.cerrar()
+
+
+def test_renovar_mantiene_el_lease(ruta):
+    cola = _cola(ruta, duracion_lease=-1.0)
+    ids = [i for i, _ in cola.reclamar('A', 8)]
+    cola.duracion_lease = 60.0
+    cola.renovar('A', ids)
+    assert cola.reclamar('B', 8) == []
+    cola.cerrar()
+
+
+def test_agotar_intentos_marca_error(ruta):
+    cola = ColaTrabajo(ruta, duracion_lease=-1.0, max_intentos=2)
+    cola.encolar(["1/sqrt(9 - x**2)"])
+    assert len(cola.reclamar('A')) == 1
+    assert len(cola.reclamar('B')) == 1
+    assert cola.reclamar('C') == []
+    assert not cola.hay_trabajo()
+    (resultado,) = cola.resultados()
+    assert resultado['estado'] == 'error'
+    assert resultado['mensaje'] == 'Se agotaron los intentos'
+    cola.cerrar()
+
+
+def test_resultados_en_orden_de_encolado(ruta):
+    cola = _cola(ruta)
+    tareas = cola.reclamar('A', 8)
+    for id_, _ in reversed(tareas):
+        cola.completar('A', id_, dict(RESUELTO, indice=id_))
+    assert [r['indice'] for r in cola.resultados()] == [id_ for id_, _ in tareas]
+    assert cola.progreso()['por_estado'] == {'resuelto': 2}
+    cola.cerrar()
@@ -0,0 +1,57 @@
+import pytest
+import sympy as sp
+
+from index import x, clasificar_radicando, forma_canonica, interpretar_funcion
+
+
+@pytest.mark.parametrize('funcion, esperado', [
+    ("1/sqrt(9 - x**2)", ('tipo1', 3, 1)),
+    ("sqrt(9 - 4*x**2)", ('tipo1', 3, 2)),
+    ("x**2/sqrt(16 + x**2)", ('tipo2', 4, 1)),
+    ("1/(x * sqrt(x**2 - 25))", ('tipo3', 5, 1)),
+    ("(4 - x**2)**(3/2)", ('tipo1', 2, 1)),
+    ("1/sqrt(5 - x**2)", ('tipo1', sp.sqrt(5), 1)),
+])
+def test_clasificar_radicando(funcion, esperado):
+    assert clasificar_radicando(interpretar_funcion(funcion)) == esperado
+
+
+@pytest.mark.parametrize('funcion', ["1/(1 + x**2)", "sqrt(x)", "sqrt(x**3 + 1)", "x**2"])
+def test_clasificar_radicando_sin_patron(funcion):
+    assert clasificar_radicando(interpretar_funcion(funcion)) is None
+
+
+def test_clasificar_radicando_simbolico():
+    b = sp.Symbol('b', positive=True)
+    assert clasificar_radicando(sp.sqrt(b**2 - x**2)) == ('tipo1', b, 1)
+
+
+def test_forma_canonica_completa_el_cuadrado():
+    canonica, h = forma_canonica(interpretar_funcion("1/sqrt(x**2 + 2*x + 5)"))
+    assert h == 1
+    assert canonica == 1 / sp.sqrt(x**2 + 4)
+    assert clasificar_radicando(canonica) == ('tipo2', 2, 1)
+
+
+def test_forma_canonica_sin_termino_lineal():
+    assert forma_canonica(interpretar_funcion("1/sqrt(9 - x**2)")) is None
+
+
+@pytest.mark.parametrize('texto', [
+    "__import__('os').getpid()",
+    "().__class__",
+    "x.func",
+    "lambda: 1",
+    "[c for c in ()]",
+    "f(x, 'sqrt(2)')",
+    "(1, 2)",
+])
+def test_interpretar_funcion_rechaza_texto_no_aritmetico(texto):
+    with pytest.raises(ValueError):
+        interpretar_funcion(texto)
+
+
+def test_interpretar_funcion_acepta_notacion_habitual():
+    assert interpretar_funcion("x^2/sqrt(16 + x**2)") == x**2 / sp.sqrt(16 + x**2)
+    assert interpretar_funcion("ln(x) + pi") == sp.log(x) + sp.pi
+    assert interpretar_funcion("1.5*x") == sp.Float(1.5) * x
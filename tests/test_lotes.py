@@ -0,0 +1,49 @@
+import io
+import json
+
+from index import PuntoControl, resolver_jsonl
+
+ENTRADA = [
+    '"1/sqrt(9 - x**2)"\n',
+    '{"funcion": "x**2/sqrt(16 + x**2)"}\n',
+    '\n',
+    '{"otro": 1}\n',
+    '"1/(x * sqrt(x**2 - 25))"\n',
+]
+
+
+def _resolver(tmp_path, **opciones):
+    salida = io.StringIO()
+    resolver_jsonl(iter(ENTRADA), salida, max_procesos=1, timeout=30, **opciones)
+    return [json.loads(linea) for linea in salida.getvalue().splitlines()]
+
+
+def test_resolver_jsonl_en_orden_de_entrada(tmp_path):
+    filas = _resolver(tmp_path)
+    assert [f['indice'] for f in filas] == [0, 1, 3, 4]
+    assert [f['estado'] for f in filas] == ['resuelto', 'resuelto', 'error', 'resuelto']
+    assert filas[0]['tipo'] == 'tipo1' and filas[0]['a'] == '3'
+    assert filas[0]['resultado'] == 'asin(x/3)'
+
+
+def test_resolver_jsonl_reanuda_desde_checkpoint(tmp_path):
+    ruta = tmp_path / 'puntos.txt'
+    ruta.write_text('0\n3\n', encoding='utf-8')
+    filas = _resolver(tmp_path, ruta_checkpoint=str(ruta))
+    assert [f['indice'] for f in filas] == [1, 4]
+
+    # Una segunda ejecución no repite nada
+    assert _resolver(tmp_path, ruta_checkpoint=str(ruta)) == []
+    punto_control = PuntoControl(str(ruta))
+    assert punto_control.contiguo == 1 and punto_control.sueltos == {3, 4}
+    punto_control.cerrar()
+
+
+def test_punto_control_compacta_prefijo(tmp_path):
+    punto_control = PuntoControl(str(tmp_path / 'puntos.txt'))
+    for indice in (2, 0, 5, 1):
+        punto_control.registrar(indice)
+    assert punto_control.contiguo == 2 and punto_control.sueltos == {5}
+    assert punto_control.contiene(1) and punto_control.contiene(5)
+    assert not punto_control.contiene(3)
+    punto_control.cerrar()
@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+import pytest
+
+from servicio import ServicioIntegrales
+
+
+async def _peticion(puerto, crudo):
+    lector, escritor = await asyncio.open_connection('127.0.0.1', puerto)
+    escritor.write(crudo)
+    await escritor.drain()
+    respuesta = await lector.read()
+    escritor.close()
+    cabecera, _, cuerpo = respuesta.partition(b'\r\n\r\n')
+    return int(cabecera.split()[1]), json.loads(cuerpo)
+
+
+def _post(cuerpo, tipo='application/json'):
+    datos = cuerpo if isinstance(cuerpo, bytes) else json.dumps(cuerpo).encode()
+    return (f"POST /resolver HTTP/1.1\r\nContent-Type: {tipo}\r\n"
+            f"Content-Length: {len(datos)}\r\n\r\n").encode() + datos
+
+
+CASOS = [
+    (_post({'funcion': '1/sqrt(9 - x**2)'}), 200),
+    (b"GET /salud HTTP/1.1\r\n\r\n", 200),
+    (b"GET /otra HTTP/1.1\r\n\r\n", 404),
+    (b"basura\r\n\r\n", 400),
+    (_post(b'{"sin_funcion": 1}'), 400),
+    (_post(b'no es json'), 400),
+    (_post({'funcion': '1/sqrt(9 - x**2)', 'timeout': -1}), 400),
+    (_post({'funcion': '1/sqrt(9 - x**2)', 'timeout': 'NaN'}), 400),
+    (_post({'funcion': '1/sqrt(9 - x**2)'}, tipo='text/plain'), 415),
+    (b"POST /resolver HTTP/1.1\r\nContent-Type: application/json\r\n"
+     b"Content-Length: 999999999\r\n\r\n", 413),
+    (_post({'funcion': "__import__('os').getpid()"}), 422),
+    (_post({'funcion': 'x**3*sqrt(x**2 + 7)/(x + 1)', 'timeout': 0.001}), 504),
+]
+
+
+@pytest.fixture(scope='module')
+def servicio():
+    bucle = asyncio.new_event_loop()
+    servicio = bucle.run_until_complete(ServicioIntegrales(puerto=0, procesos=1).iniciar())
+    yield bucle, servicio
+    bucle.run_until_complete(servicio.detener())
+    bucle.close()
+
+
+@pytest.mark.parametrize('crudo, estado', CASOS)
+def test_estados_http(servicio, crudo, estado):
+    bucle, servidor = servicio
+    obtenido, cuerpo = bucle.run_until_complete(_peticion(servidor.puerto, crudo))
+    assert obtenido == estado, cuerpo
+
+
+def test_resuelve_con_esquema_comun(servicio):
+    bucle, servidor = servicio
+    _, cuerpo = bucle.run_until_complete(
+        _peticion(servidor.puerto, _post({'funcion': '1/sqrt(9 - x**2)'})))
+    assert cuerpo['estado'] == 'resuelto'
+    assert (cuerpo['tipo'], cuerpo['a'], cuerpo['resultado']) == ('tipo1', '3', 'asin(x/3)')
+
+
+def test_cabecera_demasiado_larga_no_tumba_el_servicio(servicio):
+    bucle, servidor = servicio
+
+    async def enviar_cabecera_larga():
+        lector, escritor = await asyncio.open_connection('127.0.0.1', servidor.puerto)
+        escritor.write(b"GET /salud HTTP/1.1\r\nX-Largo: " + b"a" * 200000 + b"\r\n\r\n")
+        await escritor.drain()
+        try:
+            await lector.read()
+        except ConnectionResetError:
+            pass
+        escritor.close()
+
+    bucle.run_until_complete(enviar_cabecera_larga())
+    estado, _ = bucle.run_until_complete(
+        _peticion(servidor.puerto, b"GET /salud HTTP/1.1\r\n\r\n"))
+    assert estado == 200
+
+
+def test_cola_llena_responde_503(servicio):
+    bucle, servidor = servicio
+    max_cola, servidor.max_cola = servidor.max_cola, 0
+    try:
+        estado, _ = bucle.run_until_complete(
+            _peticion(servidor.puerto, _post({'funcion': '1/sqrt(9 - x**2)'})))
+    finally:
+        servidor.max_cola = max_cola
+    assert estado == 503
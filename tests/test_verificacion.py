@@ -0,0 +1,65 @@
+import pytest
+import sympy as sp
+
+from index import (x, a_sym, FamiliaParametrica, SustitucionTrigonometricaInteractiva,
+                   interpretar_funcion)
+
+
+def _resuelto(funcion, **opciones):
+    resolvedor = SustitucionTrigonometricaInteractiva(funcion, x, silencioso=True, **opciones)
+    assert resolvedor.resolver() is not None, resolvedor.error
+    return resolvedor
+
+
+def test_verificar_acepta_resultado_correcto():
+    for funcion in ("1/(x**2 * sqrt(x**2 - 4))", "1/sqrt(9 - x**2)", "x**2/sqrt(16 + x**2)",
+                    "1/sqrt(x**2 + 2*x + 5)"):
+        veredicto = _resuelto(interpretar_funcion(funcion)).verificar(semilla=0)
+        assert veredicto['valido'] is True, funcion
+        assert veredicto['puntos'] > 0
+
+
+def test_verificar_rechaza_resultado_incorrecto():
+    resolvedor = _resuelto(interpretar_funcion("1/sqrt(9 - x**2)"))
+    resolvedor.resultado_final = sp.asin(x / 2)
+    assert resolvedor.verificar(semilla=0)['valido'] is False
+
+
+def test_verificar_con_constante_simbolica():
+    b = sp.Symbol('b', positive=True)
+    veredicto = _resuelto(sp.sqrt(b**2 - x**2)).verificar(semilla=0)
+    assert veredicto['valido'] is True
+    assert set(veredicto['parametros']) == {b}
+
+
+def test_verificar_plantilla_de_familia():
+    familia = FamiliaParametrica.desde_integrando(interpretar_funcion("1/sqrt(9 - x**2)"))
+    veredicto = _resuelto(familia.plantilla).verificar(semilla=0)
+    assert veredicto['valido'] is True
+    assert a_sym in veredicto['parametros']
+
+
+def test_verificar_no_concluyente_no_lanza():
+    resolvedor = _resuelto(interpretar_funcion("1/sqrt(9 - x**2)"))
+    resolvedor.resultado_final = sp.Function('g')(x)
+    veredicto = resolvedor.verificar()
+    assert veredicto['valido'] is None
+    assert veredicto['mensaje']
+
+
+def test_resolver_detallado_conserva_resultado_simbolico(capsys):
+    b = sp.Symbol('b', positive=True)
+    resolvedor = SustitucionTrigonometricaInteractiva(sp.sqrt(b**2 - x**2), x,
+                                                      nivel_detalle='detallado', graficos=False)
+    resultado = resolvedor.resolver()
+    capsys.readouterr()
+    assert resultado is not None
+    assert sp.simplify(sp.diff(resultado, x) - sp.sqrt(b**2 - x**2)) == 0
+
+
+def test_dominio_valido_con_a_simbolico():
+    familia = FamiliaParametrica.desde_integrando(interpretar_funcion("1/sqrt(9 - x**2)"))
+    resolvedor = _resuelto(familia.plantilla)
+    assert resolvedor.dominio_valido({a_sym: 2}) == (-2.0, 2.0)
+    with pytest.raises(ValueError):
+        resolvedor.dominio_valido()